@@ -0,0 +1,141 @@
+"""Local analytics over the gold layer with DuckDB
+
+AnalyticsEngine exposes the gold tables as DuckDB views named and shaped
+like the MySQL tables (patients, doctors, appointments, with the columns in
+storage.SQL_COLUMNS), reading the Parquet or CSV files in place. The
+reports in queries.sql therefore run unchanged, without a MySQL server:
+
+    python analytics.py                  # every report in queries.sql
+    python analytics.py --query "SELECT COUNT(*) FROM appointments"
+
+DuckDB is optional: pip install duckdb.
+"""
+
+import argparse
+import logging
+from pathlib import Path
+
+from storage import SQL_COLUMNS, detect_storage
+
+logger = logging.getLogger(__name__)
+
+# MySQL functions used by queries.sql, as DuckDB macros
+MYSQL_MACROS = [
+    # MySQL's %Y/%m/%d/%H/%i specifiers; %i (minutes) is %M in strftime
+    "CREATE MACRO DATE_FORMAT(d, f) AS strftime(d, replace(f, '%i', '%M'))",
+]
+
+
+def split_statements(sql):
+    """Yield ``(title, statement)`` for each statement in a SQL script
+
+    The title is the last ``--`` comment before the statement, e.g.
+    "6. Follow-up analysis by specialty".
+    """
+    title = None
+    lines = []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not stripped and not lines:
+            continue
+        if stripped.startswith("--"):
+            if not lines:
+                title = stripped.lstrip("- ").strip()
+            continue
+        lines.append(line)
+        if stripped.endswith(";"):
+            statement = "\n".join(lines).strip().rstrip(";").strip()
+            if statement:
+                yield title, statement
+            lines = []
+    statement = "\n".join(lines).strip().rstrip(";").strip()
+    if statement:
+        yield title, statement
+
+
+class AnalyticsEngine:
+    """Run SQL over the gold layer files with an in-process DuckDB"""
+
+    def __init__(self, output_dir="processed_data", database=":memory:"):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError(
+                "Local analytics requires duckdb: pip install duckdb"
+            ) from e
+
+        self.output_dir = Path(output_dir)
+        self.conn = duckdb.connect(database)
+        for macro in MYSQL_MACROS:
+            self.conn.execute(macro)
+        self._create_views()
+
+    def _create_views(self):
+        storage = detect_storage(self.output_dir)
+        for table, columns in SQL_COLUMNS.items():
+            # One file, or one per month for partitioned tables
+            paths = storage.files("gold", table)
+            if not paths:
+                logger.warning(
+                    f"Gold table {table} not found at {storage.path('gold', table)}"
+                )
+                continue
+            quoted = ", ".join(
+                "'" + str(path).replace("'", "''") + "'" for path in paths
+            )
+            if storage.format == "parquet":
+                source = f"read_parquet([{quoted}])"
+            else:
+                source = f"read_csv_auto([{quoted}], header=true, union_by_name=true)"
+            select = []
+            for column, name in columns.items():
+                # MySQL stores BOOLEAN as TINYINT, so SUM/AVG work on it
+                expr = f'"{column}"::INTEGER' if name == "follow_up" else f'"{column}"'
+                select.append(f"{expr} AS {name}")
+            self.conn.execute(
+                f"CREATE OR REPLACE VIEW {table} AS SELECT {', '.join(select)} FROM {source}"
+            )
+
+    def query(self, sql, params=None):
+        """Run one SQL statement and return its result as a DataFrame
+
+        Each call gets its own cursor, so one engine can serve several
+        threads (e.g. Streamlit sessions).
+        """
+        with self.conn.cursor() as cursor:
+            return cursor.execute(sql, params).df()
+
+    def run_script(self, path="queries.sql"):
+        """Run every statement of a SQL script; return ``(title, DataFrame)`` pairs"""
+        sql = Path(path).read_text()
+        return [(title, self.query(stmt)) for title, stmt in split_statements(sql)]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run analytics SQL against the gold layer with DuckDB"
+    )
+    parser.add_argument("script", nargs="?", default="queries.sql")
+    parser.add_argument("--output-dir", default="processed_data")
+    parser.add_argument("--query", help="run this statement instead of the script")
+    args = parser.parse_args()
+
+    with AnalyticsEngine(args.output_dir) as engine:
+        if args.query:
+            results = [(None, engine.query(args.query))]
+        else:
+            results = engine.run_script(args.script)
+        for title, df in results:
+            if title:
+                print(f"-- {title}")
+            print(df.to_string(index=False))
+            print()
@@ -0,0 +1,93 @@
+"""Throughput benchmarks for each pipeline stage and the whole run
+
+Run with pytest-benchmark (see conftest.py for the settings):
+
+    BENCH_ROWS=1000000 pytest benchmarks/bench_pipeline.py --benchmark-autosave
+    pytest benchmarks/bench_pipeline.py --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Each stage is timed on its own, with the layers it reads prepared outside
+the timed section. Peak RSS and per-step timings from the pipeline's run
+metrics are saved in each benchmark's extra_info.
+"""
+
+import json
+
+import pytest
+
+import data_cleaner
+from conftest import MYSQL_URL, ROWS, record_metrics
+
+ROUNDS = 3
+
+
+def test_bronze(benchmark, pipeline, source_csv):
+    benchmark.pedantic(pipeline.extract_bronze, args=(source_csv,), rounds=ROUNDS)
+    record_metrics(benchmark, pipeline, ROWS)
+
+
+def test_bronze_streaming(benchmark, pipeline, source_csv):
+    benchmark.pedantic(
+        pipeline.extract_bronze,
+        args=(source_csv,),
+        kwargs={"streaming": True},
+        rounds=ROUNDS,
+    )
+    record_metrics(benchmark, pipeline, ROWS)
+
+
+@pytest.mark.parametrize("parallel", [False, True], ids=["serial", "parallel"])
+def test_silver(benchmark, pipeline, source_csv, parallel):
+    bronze = pipeline.extract_bronze(source_csv, streaming=True)
+
+    def cold_cache():
+        # Every round parses its dates from scratch, like a fresh nightly run
+        pipeline.date_cache = data_cleaner.DateParseCache()
+
+    benchmark.pedantic(
+        pipeline.transform_silver,
+        kwargs={"parallel": parallel},
+        setup=cold_cache,
+        rounds=ROUNDS,
+    )
+    record_metrics(benchmark, pipeline, bronze)
+
+
+def test_rejected(benchmark, pipeline, source_csv):
+    pipeline.extract_bronze(source_csv, streaming=True)
+    silver = pipeline.transform_silver()
+    benchmark.pedantic(pipeline.extract_rejected_records, rounds=ROUNDS)
+    record_metrics(benchmark, pipeline, len(silver))
+
+
+def test_gold(benchmark, pipeline, source_csv):
+    pipeline.extract_bronze(source_csv, streaming=True)
+    silver = pipeline.transform_silver()
+    benchmark.pedantic(pipeline.load_gold, rounds=ROUNDS)
+    record_metrics(benchmark, pipeline, len(silver))
+
+
+@pytest.mark.skipif(
+    not MYSQL_URL, reason="set BENCH_MYSQL_URL to benchmark the MySQL load"
+)
+def test_mysql(benchmark, pipeline, source_csv):
+    pipeline.extract_bronze(source_csv, streaming=True)
+    pipeline.transform_silver()
+    pipeline.load_gold()
+    benchmark.pedantic(pipeline.load_to_mysql, rounds=ROUNDS)
+    record_metrics(benchmark, pipeline, len(pipeline.gold_appointments))
+
+
+@pytest.mark.parametrize("streaming", [False, True], ids=["in_memory", "streaming"])
+def test_run_pipeline(benchmark, workdir, source_csv, streaming):
+    benchmark.pedantic(
+        data_cleaner.run_pipeline,
+        args=(source_csv,),
+        kwargs={"streaming": streaming, "load_mysql": bool(MYSQL_URL)},
+        rounds=ROUNDS,
+    )
+    # run_pipeline builds its own pipeline; use the report of the last round
+    report = sorted((workdir / "processed_data" / "_reports").glob("run_*.json"))[-1]
+    steps = json.loads(report.read_text())["steps"]
+    benchmark.extra_info["rows"] = ROWS
+    benchmark.extra_info["peak_rss_mb"] = max(s["peak_rss_mb"] or 0 for s in steps)
+    benchmark.extra_info["steps"] = {s["step"]: s["wall_seconds"] for s in steps}
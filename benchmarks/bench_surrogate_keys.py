@@ -0,0 +1,86 @@
+"""Compare patient surrogate key generation strategies
+
+Usage:
+    python benchmarks/bench_surrogate_keys.py --rows 1000000 10000000
+
+Times the batch key API for each available algorithm (with and without a
+salt) against the original row-wise ``DataFrame.apply`` + MD5, which is only
+run up to ``--legacy-max`` rows because it is so slow.
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from surrogate_keys import HASH_ALGORITHMS, surrogate_keys  # noqa: E402
+
+KEY_COLUMNS = ["Patient Name", "Patint DOB"]
+
+
+def make_patients(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    names = pd.Series(rng.integers(0, rows, rows)).map("Patient {}".format)
+    dobs = pd.Timestamp("1930-01-01") + pd.to_timedelta(
+        rng.integers(0, 365 * 90, rows), unit="D"
+    )
+    return pd.DataFrame({"Patient Name": names, "Patint DOB": dobs})
+
+
+def legacy_keys(df):
+    return df.apply(
+        lambda x: hashlib.md5(
+            str(f"{x['Patient Name']}_{x['Patint DOB']}").encode()
+        ).hexdigest(),
+        axis=1,
+    )
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--legacy-max", type=int, default=1_000_000)
+    parser.add_argument("--salt", default="benchmark-salt")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'method':<22} {'seconds':>9} {'rows/sec':>12}")
+    for rows in args.rows:
+        df = make_patients(rows)
+        cases = []
+        if rows <= args.legacy_max:
+            cases.append(("legacy apply md5", lambda: legacy_keys(df)))
+        for algorithm in HASH_ALGORITHMS:
+            for salt in (None, args.salt):
+                label = f"{algorithm}{' + salt' if salt else ''}"
+                cases.append(
+                    (
+                        label,
+                        lambda a=algorithm, s=salt: surrogate_keys(
+                            df, KEY_COLUMNS, algorithm=a, salt=s
+                        ),
+                    )
+                )
+
+        for label, func in cases:
+            try:
+                seconds = timed(func)
+            except ImportError as e:
+                print(f"{rows:>12,} {label:<22} skipped: {e}")
+                continue
+            print(f"{rows:>12,} {label:<22} {seconds:>9.2f} {rows / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
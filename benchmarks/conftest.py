@@ -0,0 +1,60 @@
+"""Fixtures for the pipeline benchmarks
+
+Settings come from environment variables:
+
+- ``BENCH_ROWS``: rows of synthetic data to generate (default 10000)
+- ``BENCH_DATA``: use this CSV instead of generating one
+- ``BENCH_MYSQL_URL``: load into this database; without it the MySQL load
+  is skipped and no database is needed
+- ``BENCH_MAX_RSS_MB``: fail a benchmark whose peak RSS exceeds this
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import data_cleaner  # noqa: E402
+from generate_data import generate  # noqa: E402
+from metrics import peak_rss_mb  # noqa: E402
+
+ROWS = int(os.environ.get("BENCH_ROWS", 10_000))
+MYSQL_URL = os.environ.get("BENCH_MYSQL_URL")
+MAX_RSS_MB = os.environ.get("BENCH_MAX_RSS_MB")
+
+
+@pytest.fixture(scope="session")
+def source_csv(tmp_path_factory):
+    if os.environ.get("BENCH_DATA"):
+        return Path(os.environ["BENCH_DATA"]).resolve()
+    path = tmp_path_factory.mktemp("data") / "healthcare_data.csv"
+    return generate(path, ROWS, seed=0)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a fresh directory, against MySQL only if one was configured"""
+    monkeypatch.chdir(tmp_path)
+    if MYSQL_URL:
+        monkeypatch.setenv("MYSQL_URL", MYSQL_URL)
+    return tmp_path
+
+
+@pytest.fixture
+def pipeline(workdir):
+    return data_cleaner.HealthDataPipeline()
+
+
+def record_metrics(benchmark, pipeline, rows):
+    """Attach the run's step metrics to the benchmark and check peak RSS"""
+    peak = peak_rss_mb()
+    benchmark.extra_info["rows"] = rows
+    benchmark.extra_info["peak_rss_mb"] = peak
+    benchmark.extra_info["steps"] = {
+        step["step"]: step.get("wall_seconds") for step in pipeline.metrics.steps
+    }
+    if MAX_RSS_MB and peak is not None:
+        assert peak <= float(MAX_RSS_MB), f"peak RSS {peak} MB over {MAX_RSS_MB} MB"
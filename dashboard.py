@@ -3,59 +3,123 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import os
-import datetime
 import numpy as np
 
+from analytics import AnalyticsEngine
+from serving import SERVING_TABLES, DoctorDateIndex, build_serving_tables
+from storage import detect_storage
+
 # --- Page Configuration ---
 st.set_page_config(page_title="Healthcare Data Pipeline", layout="wide")
 
 # --- Load Data ---
 BASE_DIR = os.path.join(os.getcwd(), 'processed_data')
 
-def load_data():
-    patients = pd.read_csv(os.path.join(BASE_DIR, 'gold/patients.csv'))
-    doctors = pd.read_csv(os.path.join(BASE_DIR, 'gold/doctors.csv'))
-    appointments = pd.read_csv(os.path.join(BASE_DIR, 'gold/appointments.csv'))
-    stats = pd.read_csv(os.path.join(BASE_DIR, 'gold/summary_stats.csv'))
-    rejected = pd.read_csv(os.path.join(BASE_DIR, 'rejected/missing_patient_records.csv'))
-    bronze = pd.read_csv(os.path.join(BASE_DIR, 'bronze/raw_health_data.csv'))
-    silver = pd.read_csv(os.path.join(BASE_DIR, 'silver/cleaned_health_data.csv'))
+# Chart payload limits: above TIMELINE_MAX_ROWS appointments the timeline becomes a
+# doctor x time density view of at most TIMELINE_MAX_BINS windows, and per-doctor
+# charts (the timeline too) show the MAX_DOCTORS busiest doctors with the rest grouped together
+TIMELINE_MAX_ROWS = 2000
+TIMELINE_MAX_BINS = 120
+MAX_DOCTORS = 20
+TABLES = [('gold', 'doctors'), ('gold', 'appointments'), ('gold', 'summary_stats'),
+          ('rejected', 'rejected_records')] + [('serving', name) for name in SERVING_TABLES]
+
+def layer_versions(storage):
+    # mtime and size of every table read, so the cache only refreshes after a pipeline run
+    return tuple((layer, name, storage.version(layer, name)) for layer, name in TABLES)
+
+# A resource, not data: the frames and indexes are shared read-only between reruns
+# instead of being copied out of the cache on every interaction
+@st.cache_resource(show_spinner='Loading pipeline outputs...', max_entries=1)
+def load_data(versions):
+    # Reads Parquet layers when the pipeline wrote them, CSV otherwise
+    storage = detect_storage(BASE_DIR)
+    doctors = storage.read('gold', 'doctors')
+    stats = storage.read('gold', 'summary_stats')
+    if storage.exists('rejected', 'rejected_records'):
+        rejected = storage.read('rejected', 'rejected_records')
+    else:
+        rejected = pd.DataFrame()
+
+    # Pre-aggregated by the pipeline; built here for outputs of older runs
+    if all(storage.exists('serving', name) for name in SERVING_TABLES):
+        serving = {name: storage.read('serving', name) for name in SERVING_TABLES}
+    else:
+        serving = build_serving_tables(storage.read('gold', 'patients'), doctors, storage.read('gold', 'appointments'))
+    counts = serving['appointment_counts']
+    counts['appointment_date'] = pd.to_datetime(counts['appointment_date'])
 
     # Clean column names
-    appointments.rename(columns=lambda x: x.strip().lower().replace(' ', '_'), inplace=True)
     doctors.rename(columns=lambda x: x.strip().lower().replace(' ', '_'), inplace=True)
-    patients.rename(columns=lambda x: x.strip().lower().replace(' ', '_'), inplace=True)
 
-    today = datetime.date.today()
-    patients['patint_dob'] = pd.to_datetime(patients['patint_dob'], errors='coerce')
-    patients['age'] = patients['patint_dob'].apply(lambda x: today.year - x.year if pd.notnull(x) else None)
+    # Sorted once here, so filters are binary searches instead of full scans
+    counts_index = DoctorDateIndex(counts, 'appointment_date')
+
+    return doctors, counts_index, stats.iloc[0], rejected, serving
+
+# Only the timeline needs single appointments, so they are read per date range; gold
+# appointments are stored by month, and only the months in the range are opened
+@st.cache_resource(show_spinner='Loading appointments...', max_entries=4)
+def load_appointments(versions, start, end, _doctors):
+    appointments = detect_storage(BASE_DIR).read_range('gold', 'appointments', start, end)
+    appointments.rename(columns=lambda x: x.strip().lower().replace(' ', '_'), inplace=True)
 
-    appointments['appointment_date_time'] = pd.to_datetime(appointments['appointment_date_time'], errors='coerce')
+    appointments['appointment_date_time'] = pd.to_datetime(appointments['appointment_date_time'], format='ISO8601', errors='coerce')
     appointments['appointment_date'] = appointments['appointment_date_time']
 
     np.random.seed(0)
     appointments['start_time'] = appointments['appointment_date_time']
     appointments['end_time'] = appointments['start_time'] + pd.to_timedelta(np.random.randint(30, 90, size=len(appointments)), unit='m')
 
-    appointments = appointments.merge(doctors[['doctor_id', 'doctor_name', 'doctor_specialty']], on='doctor_id', how='left')
-
-    return patients, doctors, appointments, stats, rejected, bronze, silver
-
-patients, doctors, appointments, stats, rejected, bronze, silver = load_data()
+    appointments = appointments.merge(_doctors[['doctor_id', 'doctor_name', 'doctor_specialty']], on='doctor_id', how='left')
+    return DoctorDateIndex(appointments, 'appointment_date')
+
+versions = layer_versions(detect_storage(BASE_DIR))
+doctors, counts_index, stats, rejected, serving = load_data(versions)
+
+@st.cache_resource(max_entries=1)
+def analytics_engine(versions):
+    # Views over the gold files; recreated when the pipeline rewrites them
+    return AnalyticsEngine(BASE_DIR)
+
+FOLLOW_UP_SQL = '''
+SELECT d.specialty, ROUND(AVG(a.follow_up) * 100, 2) AS follow_up_percentage
+FROM appointments a JOIN doctors d ON a.doctor_id = d.doctor_id
+WHERE a.appointment_datetime >= ? AND a.appointment_datetime < ?
+GROUP BY d.specialty
+ORDER BY follow_up_percentage DESC
+'''
+
+def top_doctors(counts, limit=MAX_DOCTORS):
+    # Group all but the `limit` busiest doctors under one name
+    totals = counts.groupby('doctor_name')['appointments'].sum()
+    if len(totals) <= limit:
+        return counts
+    keep = totals.nlargest(limit).index
+    counts = counts.copy()
+    counts['doctor_name'] = counts['doctor_name'].where(counts['doctor_name'].isin(keep), f'Other doctors ({len(totals) - limit})')
+    return counts
+
+def time_bins(counts, max_bins=TIMELINE_MAX_BINS):
+    # Appointments per doctor and time window, with a window wide enough for max_bins
+    days = (counts['appointment_date'].max() - counts['appointment_date'].min()).days + 1
+    window = max(1, int(np.ceil(days / max_bins)))
+    start = counts['appointment_date'].min()
+    bins = counts.assign(window=start + pd.to_timedelta((counts['appointment_date'] - start).dt.days // window * window, unit='D'))
+    return bins.pivot_table(index='doctor_name', columns='window', values='appointments', aggfunc='sum', fill_value=0), window
 
 # --- Sidebar Filters ---
 st.sidebar.title('Filter Data')
 doctor_filter = st.sidebar.selectbox('Select Doctor', options=['All'] + list(doctors['doctor_name'].unique()))
 
-min_date = appointments['appointment_date'].min()
-max_date = appointments['appointment_date'].max()
+min_date, max_date = counts_index.date_range
 date_range = st.sidebar.date_input('Select Appointment Date Range', [min_date, max_date])
+start_date = pd.to_datetime(date_range[0])
+end_date = pd.to_datetime(date_range[1]) + pd.Timedelta(days=1)
 
 # Apply Filters
-filtered_appointments = appointments.copy()
-if doctor_filter != 'All':
-    filtered_appointments = filtered_appointments[filtered_appointments['doctor_name'] == doctor_filter]
-filtered_appointments = filtered_appointments[(filtered_appointments['appointment_date'] >= pd.to_datetime(date_range[0])) & (filtered_appointments['appointment_date'] <= pd.to_datetime(date_range[1]))]
+selected_doctor = None if doctor_filter == 'All' else doctor_filter
+filtered_counts = counts_index.select(selected_doctor, start_date, end_date)
 
 # --- Title ---
 st.title('Healthcare Data Pipeline Dashboard')
@@ -70,9 +134,9 @@ This dashboard provides an end-to-end visualization of a Healthcare Data Pipelin
 # --- Top KPIs ---
 st.markdown("### Key Metrics")
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("Total Patients", f"{len(patients)}")
-col2.metric("Total Doctors", f"{len(doctors)}")
-col3.metric("Total Appointments", f"{len(appointments)}")
+col1.metric("Total Patients", f"{stats['total_patients']}")
+col2.metric("Total Doctors", f"{stats['total_doctors']}")
+col3.metric("Total Appointments", f"{stats['total_appointments']}")
 col4.metric("Rejected Records", f"{len(rejected)}")
 
 # --- Patient Demographics ---
@@ -80,26 +144,33 @@ st.markdown("### Patient Demographics")
 st.write("Analyzing the distribution of patient ages and overall demographics.")
 col5, col6 = st.columns(2)
 with col5:
-    fig_age = px.histogram(patients, x='age', nbins=20, title="Patient Age Distribution")
+    fig_age = px.histogram(serving['patient_ages'], x='age', y='patients', histfunc='sum', nbins=20, title="Patient Age Distribution")
     st.plotly_chart(fig_age, use_container_width=True)
 with col6:
-    if 'patient_gendr' in patients.columns:
-        fig_gender = px.pie(patients, names='patient_gendr', title="Gender Distribution")
-        st.plotly_chart(fig_gender, use_container_width=True)
+    fig_gender = px.pie(serving['gender_counts'], names='patient_gendr', values='patients', title="Gender Distribution")
+    st.plotly_chart(fig_gender, use_container_width=True)
 
 # --- Appointment Timeline ---
 st.markdown("### Appointment Timeline")
 st.write("Visualizing scheduled appointments across doctors and time.")
-fig_timeline = px.timeline(filtered_appointments, x_start='start_time', x_end='end_time', y='doctor_name', color='doctor_name', title='Appointments Scheduled by Doctor')
-fig_timeline.update_yaxes(autorange="reversed")
-st.plotly_chart(fig_timeline, use_container_width=True)
+if filtered_counts['appointments'].sum() <= TIMELINE_MAX_ROWS:
+    appointment_index = load_appointments(versions, start_date, end_date, doctors)
+    filtered_appointments = appointment_index.select(selected_doctor, start_date, end_date)
+    # One trace per doctor, so keep the MAX_DOCTORS busiest and group the rest
+    filtered_appointments = top_doctors(filtered_appointments.assign(appointments=1))
+    fig_timeline = px.timeline(filtered_appointments, x_start='start_time', x_end='end_time', y='doctor_name', color='doctor_name', title='Appointments Scheduled by Doctor')
+    fig_timeline.update_yaxes(autorange="reversed")
+    st.plotly_chart(fig_timeline, use_container_width=True)
+elif not filtered_counts.empty:
+    # Too many appointments to draw one by one; show their density instead
+    density, window = time_bins(top_doctors(filtered_counts))
+    fig_timeline = px.imshow(density, aspect='auto', labels=dict(x='Window start', y='Doctor', color='Appointments'), title=f'Appointments per Doctor ({window}-day windows)')
+    st.plotly_chart(fig_timeline, use_container_width=True)
 
 # --- Appointment Intensity Heatmap ---
 st.markdown("### Appointment Intensity Heatmap")
 st.write("Understanding peak periods for healthcare operations.")
-filtered_appointments['day_of_week'] = filtered_appointments['appointment_date_time'].dt.day_name()
-filtered_appointments['hour'] = filtered_appointments['appointment_date_time'].dt.hour
-heatmap_data = filtered_appointments.groupby(['day_of_week', 'hour']).size().reset_index(name='count')
+heatmap_data = filtered_counts.groupby(['day_of_week', 'hour'])['appointments'].sum().reset_index(name='count')
 heatmap_pivot = heatmap_data.pivot(index='day_of_week', columns='hour', values='count').fillna(0)
 fig_heatmap = px.imshow(heatmap_pivot, title='Appointment Load (Day vs Hour)')
 st.plotly_chart(fig_heatmap, use_container_width=True)
@@ -107,25 +178,33 @@ st.plotly_chart(fig_heatmap, use_container_width=True)
 # --- Doctor Specializations ---
 st.markdown("### Doctor Specializations")
 st.write("Distribution of doctor specialties across the healthcare network.")
-fig_specialization = px.pie(doctors, names='doctor_specialty', title="Distribution of Doctor Specialties")
+fig_specialization = px.pie(serving['specialty_counts'], names='doctor_specialty', values='doctors', title="Distribution of Doctor Specialties")
 st.plotly_chart(fig_specialization, use_container_width=True)
 
+# --- Follow-up Rate by Specialty ---
+st.markdown("### Follow-up Rate by Specialty")
+st.write("Share of appointments needing a follow-up, queried from the gold layer with DuckDB.")
+try:
+    follow_ups = analytics_engine(versions).query(FOLLOW_UP_SQL, [start_date, end_date])
+    fig_follow_up = px.bar(follow_ups, x='specialty', y='follow_up_percentage', title='Follow-up Rate (%) by Specialty')
+    st.plotly_chart(fig_follow_up, use_container_width=True)
+except ImportError as e:
+    st.info(str(e))
+
 # --- Doctor Performance Polar Chart ---
 st.markdown("### Doctor Performance Overview")
 st.write("Comparison of appointment handling across doctors.")
-doctor_stats = filtered_appointments.groupby('doctor_name').agg({'appointment_date_time': 'count'}).reset_index()
-doctor_stats.rename(columns={'appointment_date_time': 'Total Appointments'}, inplace=True)
+doctor_stats = top_doctors(filtered_counts).groupby('doctor_name')['appointments'].sum().reset_index(name='Total Appointments')
 fig_polar = go.Figure()
-for idx, row in doctor_stats.iterrows():
-    fig_polar.add_trace(go.Scatterpolar(r=[row['Total Appointments']], theta=['Total Appointments'], fill='toself', name=row['doctor_name']))
+for doctor_name, total in zip(doctor_stats['doctor_name'], doctor_stats['Total Appointments']):
+    fig_polar.add_trace(go.Scatterpolar(r=[total], theta=['Total Appointments'], fill='toself', name=doctor_name))
 fig_polar.update_layout(polar=dict(radialaxis=dict(visible=True)), showlegend=True)
 st.plotly_chart(fig_polar, use_container_width=True)
 
 # --- Appointment Growth Over Time ---
 st.markdown("### Appointment Growth Trend")
 st.write("Tracking the number of appointments booked over weeks.")
-filtered_appointments['week'] = filtered_appointments['appointment_date_time'].dt.isocalendar().week
-weekly_counts = filtered_appointments.groupby('week').size().reset_index(name='appointments')
+weekly_counts = filtered_counts.groupby('week')['appointments'].sum().reset_index(name='appointments')
 fig_growth = px.line(weekly_counts, x='week', y='appointments', title='Appointments Booked Per Week')
 st.plotly_chart(fig_growth, use_container_width=True)
 
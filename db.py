@@ -0,0 +1,120 @@
+"""MySQL connection settings and a lazily created, pooled engine
+
+The connection comes from the environment (or a ``.env`` file when
+python-dotenv is installed): either a full SQLAlchemy URL in ``MYSQL_URL``
+or its parts in ``MYSQL_USER``, ``MYSQL_PASSWORD``, ``MYSQL_HOST``,
+``MYSQL_PORT`` and ``MYSQL_DATABASE``. Pool settings are read from
+``MYSQL_POOL_SIZE``, ``MYSQL_MAX_OVERFLOW``, ``MYSQL_POOL_RECYCLE`` and
+``MYSQL_POOL_TIMEOUT``, and the connections each table is bulk loaded over
+from ``MYSQL_LOAD_CONNECTIONS``.
+
+SQLAlchemy and the MySQL driver are only imported when an engine is
+created, so the file-only pipeline stages never load them.
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseConfig:
+    """Where and how to connect to MySQL"""
+
+    def __init__(
+        self,
+        url=None,
+        user="root",
+        password="",
+        host="localhost",
+        port=3306,
+        database="healthcare_db",
+        pool_size=5,
+        max_overflow=10,
+        pool_recycle=3600,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        load_connections=4,
+    ):
+        self.url = url
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = int(port)
+        self.database = database
+        self.pool_size = int(pool_size)
+        self.max_overflow = int(max_overflow)
+        # Reconnect before MySQL's wait_timeout drops idle connections
+        self.pool_recycle = int(pool_recycle)
+        self.pool_timeout = int(pool_timeout)
+        self.pool_pre_ping = pool_pre_ping
+        # Two tables load at once, so the pool should hold twice as many
+        self.load_connections = int(load_connections)
+
+    @classmethod
+    def from_env(cls, env_file=".env"):
+        """Build the config from MYSQL_* environment variables"""
+        try:
+            from dotenv import load_dotenv
+
+            load_dotenv(env_file)
+        except ImportError:
+            pass
+
+        settings = {
+            "url": "MYSQL_URL",
+            "user": "MYSQL_USER",
+            "password": "MYSQL_PASSWORD",
+            "host": "MYSQL_HOST",
+            "port": "MYSQL_PORT",
+            "database": "MYSQL_DATABASE",
+            "pool_size": "MYSQL_POOL_SIZE",
+            "max_overflow": "MYSQL_MAX_OVERFLOW",
+            "pool_recycle": "MYSQL_POOL_RECYCLE",
+            "pool_timeout": "MYSQL_POOL_TIMEOUT",
+            "load_connections": "MYSQL_LOAD_CONNECTIONS",
+        }
+        return cls(
+            **{
+                key: os.environ[var]
+                for key, var in settings.items()
+                if var in os.environ
+            }
+        )
+
+    def sqlalchemy_url(self):
+        from sqlalchemy.engine import URL, make_url
+
+        if self.url:
+            return make_url(self.url)
+        return URL.create(
+            "mysql+pymysql",
+            username=self.user,
+            password=self.password or None,
+            host=self.host,
+            port=self.port,
+            database=self.database,
+        )
+
+    def __repr__(self):
+        # Never show the password
+        url = self.sqlalchemy_url().render_as_string(hide_password=True)
+        return f"DatabaseConfig({url!r})"
+
+
+def create_engine(config):
+    """Create a pooled SQLAlchemy engine for config"""
+    import sqlalchemy
+
+    url = config.sqlalchemy_url()
+    options = {"pool_pre_ping": config.pool_pre_ping}
+    if url.get_backend_name() == "mysql":
+        options.update(
+            pool_size=config.pool_size,
+            max_overflow=config.max_overflow,
+            pool_recycle=config.pool_recycle,
+            pool_timeout=config.pool_timeout,
+            # Needed for the LOAD DATA LOCAL INFILE bulk load path
+            connect_args={"local_infile": True},
+        )
+    return sqlalchemy.create_engine(url, **options)
@@ -0,0 +1,99 @@
+"""Persistent natural-key to surrogate-key mappings for gold dimensions
+
+A DimensionStore keeps one append-only CSV file per dimension holding the
+natural key columns and the surrogate ID issued for them. The whole mapping
+is loaded into a dict on first use, so lookups are hash lookups; keys seen
+for the first time get the next ID and are appended to the file. IDs are
+therefore stable across runs no matter what order the rows arrive in.
+"""
+
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class DimensionStore:
+    """Natural key -> integer surrogate key mapping kept on disk"""
+
+    def __init__(self, path, key_columns, id_column):
+        self.path = Path(path)
+        self.key_columns = list(key_columns)
+        self.id_column = id_column
+        self._index = None
+        self._next_id = 1
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._load()
+        return self._index
+
+    def __len__(self):
+        return len(self.index)
+
+    def _load(self):
+        self._index = {}
+        if not self.path.exists():
+            return
+        # Only empty cells are missing; names like "NA" are real values
+        stored = pd.read_csv(
+            self.path, dtype=str, keep_default_na=False, na_values=[""]
+        )
+        ids = stored[self.id_column].astype(int).tolist()
+        self._index = dict(zip(self._keys(stored), ids))
+        self._next_id = max(ids, default=0) + 1
+        logger.info(f"Loaded {len(self._index)} keys from {self.path}")
+
+    def _keys(self, df):
+        """Return each row's natural key as a tuple of strings (None if missing)"""
+        columns = []
+        for col in self.key_columns:
+            values = df[col].astype(object)
+            columns.append([None if pd.isna(v) else str(v) for v in values.tolist()])
+        return list(zip(*columns))
+
+    def lookup(self, df):
+        """Return the stored ID for each row of df, or NaN for unknown keys"""
+        index = self.index
+        return pd.Series(
+            [index.get(key) for key in self._keys(df)], index=df.index, dtype=float
+        )
+
+    def assign(self, df):
+        """Return an ID for each row of df, issuing and saving IDs for new keys"""
+        index = self.index
+        keys = self._keys(df)
+
+        new_keys = list(dict.fromkeys(key for key in keys if key not in index))
+        if new_keys:
+            new_ids = range(self._next_id, self._next_id + len(new_keys))
+            self._append(new_keys, new_ids)
+            index.update(zip(new_keys, new_ids))
+            self._next_id += len(new_keys)
+            logger.info(f"Issued {len(new_keys)} new {self.id_column} values")
+
+        return pd.Series([index[key] for key in keys], index=df.index, dtype=int)
+
+    def seed(self, df):
+        """Register existing key -> ID pairs, e.g. from gold tables written earlier"""
+        index = self.index
+        pairs = [
+            (key, int(id_))
+            for key, id_ in zip(self._keys(df), df[self.id_column])
+            if key not in index
+        ]
+        if not pairs:
+            return
+        keys, ids = zip(*pairs)
+        self._append(keys, ids)
+        index.update(pairs)
+        self._next_id = max(self._next_id, max(ids) + 1)
+
+    def _append(self, keys, ids):
+        rows = pd.DataFrame(list(keys), columns=self.key_columns)
+        rows[self.id_column] = list(ids)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        rows.to_csv(self.path, mode="a", header=not self.path.exists(), index=False)
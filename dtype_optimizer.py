@@ -0,0 +1,31 @@
+"""Compact in-memory dtypes for silver and gold frames
+
+Uses the column kinds declared in storage.LAYER_SCHEMAS: low-cardinality
+text becomes ``category``, flags become nullable ``boolean`` and integer
+IDs are downcast to the smallest integer type that holds them. Free text
+("string" columns such as names and notes) stays as Python strings, since
+patient keys hash the ``str()`` of each value and nullable string dtypes
+would turn missing names into ``<NA>`` instead of ``nan``.
+"""
+
+import pandas as pd
+
+
+def frame_memory_mb(df):
+    """Deep memory usage of df in MB"""
+    return round(df.memory_usage(deep=True).sum() / 1024**2, 2)
+
+
+def optimize_dtypes(df, schema):
+    """Return df with its schema columns cast to compact dtypes"""
+    df = df.copy()
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        if kind == "category" and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+        elif kind == "bool":
+            df[col] = df[col].astype("boolean")
+        elif kind == "int" and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
@@ -0,0 +1,218 @@
+"""Out-of-core deduplication for data sets larger than memory
+
+ExternalDeduplicator drops rows with a duplicate key, keeping the first
+occurrence like ``drop_duplicates(keep="first")``, while holding only one
+partition of the data in memory at a time:
+
+1. add() hashes the key of each incoming chunk and appends its rows, tagged
+   with their position in the input, to one of ``fan_out`` spill files
+   chosen by the hash.
+2. dedup_partition() loads one spill file at a time and keeps the first row
+   per key; every copy of a key lands in the same file. A file larger than
+   ``memory_mb`` is first split further on the next digit of the hash.
+3. merge() k-way merges the deduplicated partitions by input position, so
+   the surviving rows come back in their original order.
+"""
+
+import logging
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping columns carried through the spill files
+POSITION_COLUMN = "_dedup_position"
+HASH_COLUMN = "_dedup_hash"
+
+
+def key_hashes(df, key):
+    """Return a 64-bit hash per row of the key columns
+
+    Equal keys hash alike in every chunk, whatever dtype a chunk inferred
+    for an all-missing column.
+    """
+    columns = {}
+    for col in key:
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            columns[col] = values.astype("datetime64[ns]").to_numpy().view("int64")
+        else:
+            columns[col] = values.astype(object).where(values.notna(), None)
+    frame = pd.DataFrame(columns, index=df.index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def _append_run(path, df):
+    with open(path, "ab") as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_runs(path):
+    """Yield the frames appended to a spill file, in order"""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class ExternalDeduplicator:
+    """Deduplicate a stream of DataFrame chunks by key through spill files
+
+    ``memory_mb`` bounds the in-memory size of a partition when it is
+    deduplicated, and merge() yields chunks of about ``chunksize`` rows.
+    Spill files go to a temporary directory under ``spill_dir`` (the system
+    temporary directory by default) that is removed by close().
+    """
+
+    def __init__(
+        self, key, spill_dir=None, memory_mb=512, fan_out=16, chunksize=100_000
+    ):
+        self.key = list(key)
+        self.memory_mb = memory_mb
+        self.fan_out = fan_out
+        # Each deduplicated partition is written in pieces, so merging one
+        # piece per partition holds about chunksize rows
+        self.piece_rows = max(1, chunksize // fan_out)
+        self.max_depth = int(64 // np.log2(fan_out))
+        if spill_dir is not None:
+            Path(spill_dir).mkdir(parents=True, exist_ok=True)
+        self._tmp = tempfile.TemporaryDirectory(prefix="dedup_", dir=spill_dir)
+        self.spill_dir = Path(self._tmp.name)
+        self.rows_in = 0
+        self.rows_out = 0
+        # In-memory MB spilled per partition, keyed by its hash digits
+        self._sizes = {}
+        self._deduped = []
+
+    def _path(self, partition):
+        return self.spill_dir / ("part-" + "-".join(map(str, partition)))
+
+    def _split(self, df, parent):
+        """Spill df's rows to the children of parent; return their names"""
+        divisor = np.uint64(self.fan_out ** len(parent))
+        digits = df[HASH_COLUMN].to_numpy() // divisor % np.uint64(self.fan_out)
+        children = []
+        for digit, rows in pd.Series(digits).groupby(digits).indices.items():
+            partition = parent + (int(digit),)
+            part = df.take(rows)
+            _append_run(self._path(partition), part)
+            size = part.memory_usage(deep=True).sum() / 1024**2
+            self._sizes[partition] = self._sizes.get(partition, 0) + size
+            children.append(partition)
+        return children
+
+    def add(self, chunk):
+        """Spill a chunk of rows; rows must be added in input order"""
+        if chunk.empty:
+            return
+        hashes = key_hashes(chunk, self.key)
+        positions = np.arange(self.rows_in, self.rows_in + len(chunk))
+        self._split(
+            chunk.assign(**{POSITION_COLUMN: positions, HASH_COLUMN: hashes}), ()
+        )
+        self.rows_in += len(chunk)
+
+    def partitions(self):
+        """Top-level partitions waiting to be deduplicated"""
+        return sorted(p[0] for p in self._sizes if len(p) == 1)
+
+    def _batches(self, path):
+        """Yield a spill file's runs concatenated into batches of up to memory_mb"""
+        batch, size = [], 0
+        for run in _read_runs(path):
+            batch.append(run)
+            size += run.memory_usage(deep=True).sum() / 1024**2
+            if size >= self.memory_mb:
+                yield pd.concat(batch)
+                batch, size = [], 0
+        if batch:
+            yield pd.concat(batch)
+
+    def dedup_partition(self, partition):
+        """Deduplicate one top-level partition; return ``(rows_in, rows_out)``"""
+        rows_in = rows_out = 0
+        pending = [((partition,), True)]
+        while pending:
+            name, splittable = pending.pop()
+            path = self._path(name)
+            size = self._sizes.pop(name)
+            if splittable and size > self.memory_mb and len(name) < self.max_depth:
+                children = set()
+                for batch in self._batches(path):
+                    children.update(self._split(batch, name))
+                path.unlink()
+                # A single child means every row shares one hash; stop splitting
+                pending.extend((child, len(children) > 1) for child in children)
+                continue
+            if size > self.memory_mb:
+                logger.warning(
+                    f"Partition {name} holds {size:.0f} MB of rows with one key hash"
+                )
+
+            runs = []
+            for run in _read_runs(path):
+                rows_in += len(run)
+                # Runs are in input order, so dropping repeats within each
+                # run first still keeps the first occurrence overall
+                runs.append(run.drop_duplicates(subset=self.key, keep="first"))
+            path.unlink()
+            df = pd.concat(runs, ignore_index=True)
+            df = df.drop_duplicates(subset=self.key, keep="first")
+            rows_out += len(df)
+
+            out = self.spill_dir / ("dedup-" + path.name)
+            for start in range(0, len(df), self.piece_rows):
+                _append_run(out, df.iloc[start : start + self.piece_rows])
+            if len(df):
+                self._deduped.append(out)
+
+        self.rows_out += rows_out
+        return rows_in, rows_out
+
+    def merge(self):
+        """Yield the deduplicated rows in input order, as DataFrame chunks"""
+        for partition in self.partitions():
+            self.dedup_partition(partition)
+
+        streams = [_read_runs(path) for path in self._deduped]
+        buffers = [next(stream) for stream in streams]
+        positions = [buffer[POSITION_COLUMN].to_numpy() for buffer in buffers]
+        while True:
+            live = [i for i, buffer in enumerate(buffers) if buffer is not None]
+            if not live:
+                return
+            # Unread rows of a partition come after its buffered ones, so
+            # nothing unread can precede the smallest last buffered position
+            bound = min(positions[i][-1] for i in live)
+            parts = []
+            for i in live:
+                if positions[i][0] > bound:
+                    continue
+                stop = positions[i].searchsorted(bound, side="right")
+                parts.append(buffers[i].iloc[:stop])
+                if stop < len(positions[i]):
+                    buffers[i] = buffers[i].iloc[stop:]
+                    positions[i] = positions[i][stop:]
+                else:
+                    buffers[i] = next(streams[i], None)
+                    if buffers[i] is not None:
+                        positions[i] = buffers[i][POSITION_COLUMN].to_numpy()
+            chunk = pd.concat(parts).sort_values(POSITION_COLUMN, kind="stable")
+            yield chunk.drop(columns=[POSITION_COLUMN, HASH_COLUMN]).reset_index(
+                drop=True
+            )
+
+    def close(self):
+        self._tmp.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
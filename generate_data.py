@@ -0,0 +1,320 @@
+"""Generate synthetic healthcare appointment data at scale
+
+The output has the same columns and the same quirks as healthcare_data.csv:
+dates in a dozen formats (ordinal days, month names, unquoted "July 22,
+2021" values with an embedded comma, impossible dates such as 30 Feb),
+"Unknown" and blank dates, M/F/m/f/NULL genders, Yes/no/YES/true follow-ups,
+NULL or blank patient names, a leading space after the location's trailing
+comma, and exact or re-formatted duplicate rows.
+
+Patients and doctors come from fixed pools so they repeat across
+appointments the way they do in real data.
+
+Usage:
+    python generate_data.py --rows 1000000 --output synthetic_health_data.csv
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COLUMNS = [
+    "Patient Name",
+    "Patint DOB",
+    "Patient Gendr",
+    "Appointment date time",
+    "Doctor name",
+    "Doctor specialty",
+    "Appointment location",
+    "Reason for visit",
+    "Note",
+    "Follow up",
+]
+
+# Packed several to a line to keep the name pools readable
+# fmt: off
+FIRST_NAMES = [
+    "John", "Jane", "Bob", "Sarah", "Mike", "Emily", "David", "Lucy", "Alex",
+    "Maria", "Robert", "Olivia", "Sophie", "Liam", "Emma", "Daniel", "Isabella",
+    "Ethan", "Ava", "Michael", "Sophia", "William", "Mia", "James", "Charlotte",
+    "Benjamin", "Amelia", "Jacob", "Harper", "Elijah", "Evelyn", "Lucas",
+    "Abigail", "Mason", "Logan", "Elizabeth", "Victoria", "Christopher", "Grace",
+    "Andrew", "Chloe", "Joshua", "Ella", "Madison", "Matthew", "Scarlett",
+    "Anthony", "Jonathan", "Hannah", "Brandon", "Lily", "Justin", "Anna-Marie",
+]
+LAST_NAMES = [
+    "Doe", "Smith", "Johnson", "O'Connor", "King", "Murphy", "Garcia", "Brown",
+    "Davis", "Miller", "Turner", "Wilson", "Martinez", "Rodriguez", "Hernandez",
+    "Anderson", "Thomas", "Jackson", "White", "Harris", "Martin", "Thompson",
+    "Lopez", "Walker", "Young", "Hall", "Allen", "Wright", "Scott", "Adams",
+    "Baker", "Nelson", "Carter", "Mitchell", "Perez", "Roberts", "Phillips",
+    "Campbell", "Parker", "Evans", "Edwards",
+]
+# fmt: on
+
+SPECIALTIES = {
+    "Cardiology": (
+        "123 Heart St.",
+        ["Chest pain", "Check-up", "Heart check", "Routine check"],
+    ),
+    "Neurology": (
+        "456 Brain Ave.",
+        ["Headache", "Dizziness", "Migraine", "Seizures", "Memory issues"],
+    ),
+    "Orthopedics": ("789 Bone Blvd.", ["Back pain", "Knee pain", "Ankle injury"]),
+    "Dermatology": (
+        "321 Skin Rd.",
+        ["Skin rash", "Acne treatment", "Allergy", "Mole check", "Rash"],
+    ),
+    "Pediatrics": (
+        "654 Child Ln.",
+        ["Regular check-up", "Flu symptoms", "Check-up", "Flu shot", "Immunization"],
+    ),
+    "Psychiatry": ("987 Mind Way.", ["Anxiety", "Depression", "Counseling", "Stress"]),
+    "ENT": (
+        "543 Ear St.",
+        ["Hearing loss", "Sore throat", "Ear infection", "Hearing test", "Ear pain"],
+    ),
+    "General": (
+        "111 Health Pl.",
+        ["Annual physical", "Physical", "Blood work", "Fatigue", "Check-up"],
+    ),
+    "Obstetrics": ("222 Baby Blvd.", ["Prenatal check-up", "Consultation"]),
+    "Oncology": (
+        "333 Cancer Ct.",
+        ["Consultation", "Cancer screening", "Chemotherapy", "Follow-up"],
+    ),
+    "Endocrinology": ("444 Hormone Rd.", ["Thyroid check", "Diabetes check"]),
+}
+
+NOTES = [
+    "Patient reports severe migraines.",
+    "Prescribed pain relief.",
+    "Advised allergy test.",
+    "Prescribed medication.",
+    "Referred to audiologist.",
+    "Needs blood tests",
+    "Prescribed therapy.",
+]
+
+# How each patient's gender is spelled varies from row to row
+GENDER_SPELLINGS = {True: ["Male", "M", "m"], False: ["Female", "F", "f"]}
+GENDER_WEIGHTS = [0.75, 0.2, 0.05]
+NULL_GENDER_RATE = 0.04
+
+FOLLOW_UPS = ["Yes", "No", "yes", "no", "YES", "true", "false"]
+FOLLOW_UP_WEIGHTS = [0.4, 0.3, 0.1, 0.1, 0.04, 0.03, 0.03]
+
+# strftime formats seen in the source file; "{ord}" becomes 1st/2nd/3rd/...
+# fmt: off
+DOB_FORMATS = [
+    "%Y/%m/%d", "%d-%m-%Y", "%d %b %Y", "%m/%d/%Y", "%d/%m/%Y", "%d.%m.%Y",
+    "%d-%b-%Y", "%Y-%m-%d", "%Y.%m.%d", "%B %d, %Y",
+]
+APPOINTMENT_FORMATS = [
+    "%m/%d/%Y %I:%M %p", "%d %b %Y %I:%M %p", "%d-%m-%Y %H:%M",
+    "%Y.%m.%d %I:%M %p", "{ord} %B %Y %H:%M", "%m-%d-%Y %H:%M",
+    "%d/%m/%Y %H:%M", "%d.%m.%Y %H:%M", "%d %b %Y %H:%M", "%Y/%m/%d %I:%M %p",
+    "%B %d, %Y %I:%M %p", "%d %B %Y %I %p",
+]
+# fmt: on
+
+# Values the pipeline has to patch or reject
+BAD_DOBS = ["30 Feb 1980", "29 Feb 1993", "31/04/2000", "Unknown"]
+
+
+def _ordinal(days):
+    suffix = np.where(
+        (days % 100 >= 11) & (days % 100 <= 13),
+        "th",
+        np.select(
+            [days % 10 == 1, days % 10 == 2, days % 10 == 3], ["st", "nd", "rd"], "th"
+        ),
+    )
+    return pd.Series(days.astype(str)).str.cat(pd.Series(suffix)).to_numpy()
+
+
+def _format_dates(dates, formats, rng):
+    """Format each timestamp with a randomly chosen format"""
+    choice = rng.integers(0, len(formats), len(dates))
+    out = np.empty(len(dates), dtype=object)
+    for i, fmt in enumerate(formats):
+        mask = choice == i
+        if not mask.any():
+            continue
+        picked = pd.DatetimeIndex(dates[mask])
+        if "{ord}" in fmt:
+            days = _ordinal(picked.day.to_numpy())
+            rest = picked.strftime(fmt.replace("{ord}", "")).to_numpy()
+            out[mask] = days + rest
+        else:
+            out[mask] = picked.strftime(fmt).to_numpy()
+    return out
+
+
+def _gender_text(male, rng):
+    spelling = rng.choice(len(GENDER_WEIGHTS), len(male), p=GENDER_WEIGHTS)
+    out = np.where(
+        male,
+        np.array(GENDER_SPELLINGS[True], dtype=object)[spelling],
+        np.array(GENDER_SPELLINGS[False], dtype=object)[spelling],
+    )
+    out[rng.random(len(male)) < NULL_GENDER_RATE] = "NULL"
+    return out
+
+
+def make_doctors(count, rng):
+    """Return (name, specialty, location, reasons) for count doctors"""
+    specialties = list(SPECIALTIES)
+    doctors = []
+    for i in range(count):
+        first = FIRST_NAMES[rng.integers(len(FIRST_NAMES))]
+        last = LAST_NAMES[(i + rng.integers(len(LAST_NAMES))) % len(LAST_NAMES)]
+        specialty = specialties[i % len(specialties)]
+        location, reasons = SPECIALTIES[specialty]
+        suffix = f" {i // len(specialties) + 1}" if count > len(specialties) else ""
+        doctors.append((f"Dr. {first} {last}{suffix}", specialty, location, reasons))
+    return doctors
+
+
+def generate_chunk(rows, rng, doctors, patients):
+    """Build one chunk of source rows as a DataFrame of strings"""
+    # Patients are drawn from a fixed pool so they repeat across appointments
+    patient = rng.integers(0, len(patients["name"]), rows)
+    doctor = rng.integers(0, len(doctors), rows)
+    start = pd.Timestamp("2021-01-01").value // 10**9
+    appointment = rng.integers(0, 365 * 24 * 4, rows) * 900 + start
+
+    # Duplicates share the patient, doctor and time of an earlier row
+    dupes = int(rows * 0.02)
+    targets = rng.choice(np.arange(1, rows), dupes, replace=False) if rows > 1 else []
+    sources = (rng.random(len(targets)) * targets).astype(int)
+    for values in (patient, doctor, appointment):
+        values[targets] = values[sources]
+
+    names = patients["name"][patient].copy()
+    dob_text = patients["dob"][patient].copy()
+    missing = rng.random(rows)
+    names[missing < 0.01] = "NULL"
+    names[(missing >= 0.01) & (missing < 0.015)] = ""
+    bad = rng.random(rows) < 0.005
+    dob_text[bad] = rng.choice(BAD_DOBS, int(bad.sum()))
+
+    # Each row picks its own format, so most duplicates differ in how the
+    # appointment is written, like the John Doe rows in the source
+    appointment_text = _format_dates(
+        pd.to_datetime(appointment, unit="s").to_numpy(), APPOINTMENT_FORMATS, rng
+    )
+    appointment_text[rng.random(rows) < 0.005] = ""
+
+    reason_lists = [d[3] for d in doctors]
+    reason_count = np.array([len(r) for r in reason_lists])[doctor]
+    reason_table = np.array(
+        [r + [""] * (max(map(len, reason_lists)) - len(r)) for r in reason_lists],
+        dtype=object,
+    )
+    reasons = reason_table[doctor, (rng.random(rows) * reason_count).astype(int)]
+
+    notes = np.full(rows, "N/A", dtype=object)
+    has_note = rng.random(rows) < 0.2
+    notes[has_note] = rng.choice(NOTES, int(has_note.sum()))
+
+    # name, specialty and location of each row's doctor
+    doctor_fields = np.array([d[:3] for d in doctors], dtype=object)[doctor]
+    df = pd.DataFrame(
+        {
+            "Patient Name": names,
+            "Patint DOB": dob_text,
+            "Patient Gendr": _gender_text(patients["male"][patient], rng),
+            "Appointment date time": appointment_text,
+            "Doctor name": doctor_fields[:, 0],
+            "Doctor specialty": doctor_fields[:, 1],
+            # Locations end in "." and the next field starts with a space
+            "Appointment location": doctor_fields[:, 2],
+            "Reason for visit": " " + reasons,
+            "Note": notes,
+            "Follow up": rng.choice(FOLLOW_UPS, rows, p=FOLLOW_UP_WEIGHTS),
+        }
+    )
+
+    # Half of the duplicates are exact copies of their earlier row
+    exact = targets[: len(targets) // 2]
+    df.iloc[exact] = df.iloc[sources[: len(exact)]].to_numpy()
+    return df
+
+
+def make_patients(count, rng):
+    """Return a pool of patient names, genders and formatted birth dates"""
+    first = rng.choice(FIRST_NAMES, count)
+    last = rng.choice(LAST_NAMES, count)
+    # Some patients are only known by their first name
+    first_only = rng.random(count) < 0.1
+    names = np.where(first_only, first, np.char.add(np.char.add(first, " "), last))
+
+    start = pd.Timestamp("1930-01-01").value // 10**9
+    days = rng.integers(0, 365 * 75, count)
+    dobs = pd.to_datetime(start + days * 86400, unit="s").to_numpy()
+    return {
+        "name": names.astype(object),
+        "male": rng.random(count) < 0.5,
+        "dob": _format_dates(dobs, DOB_FORMATS, rng),
+    }
+
+
+def write_rows(df, file):
+    """Write rows the way the source file is written: nothing is quoted"""
+    lines = df[COLUMNS[0]].astype(str)
+    for col in COLUMNS[1:]:
+        lines = lines.str.cat(df[col].astype(str), sep=",")
+    file.write("\n".join(lines))
+    file.write("\n")
+
+
+def generate(output, rows, seed=0, chunksize=1_000_000, doctors=40, patients=None):
+    """Write rows synthetic records to output in chunks"""
+    rng = np.random.default_rng(seed)
+    doctor_pool = make_doctors(doctors, rng)
+    patient_pool = make_patients(patients or min(max(10, rows // 3), 5_000_000), rng)
+
+    start = time.perf_counter()
+    with open(output, "w") as file:
+        file.write(",".join(COLUMNS) + "\n")
+        written = 0
+        while written < rows:
+            size = min(chunksize, rows - written)
+            write_rows(generate_chunk(size, rng, doctor_pool, patient_pool), file)
+            written += size
+            logger.info(f"Wrote {written:,}/{rows:,} rows")
+    logger.info(f"Generated {rows:,} rows in {time.perf_counter() - start:.1f}s")
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic healthcare data")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--output", default="synthetic_health_data.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--doctors", type=int, default=40)
+    parser.add_argument(
+        "--patients",
+        type=int,
+        default=None,
+        help="size of the patient pool (default: a third of --rows, at most 5M)",
+    )
+    args = parser.parse_args()
+
+    generate(
+        args.output,
+        args.rows,
+        seed=args.seed,
+        chunksize=args.chunksize,
+        doctors=args.doctors,
+        patients=args.patients,
+    )
@@ -0,0 +1,161 @@
+"""Local state store for incremental ingestion
+
+Keeps, per source file, a watermark (bytes consumed, size, mtime and a
+fingerprint of the bytes just before the watermark) and, per source row, a
+content hash keyed by the row's natural key. A run only pushes rows whose
+key is new or whose content hash changed.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Raw source columns identifying a row; matches the silver dedup key
+ROW_KEY_COLUMNS = ["Patient Name", "Patint DOB", "Appointment date time"]
+
+# Bytes before the watermark used to check the file was only appended to
+FINGERPRINT_BYTES = 4096
+
+
+def hash_rows(df, columns):
+    """Return a signed 64-bit hash per row over the given columns"""
+    values = df[columns].astype(object).where(df[columns].notna(), "\x00").astype(str)
+    return pd.util.hash_pandas_object(values, index=False).astype("int64")
+
+
+def file_fingerprint(path, offset):
+    """Hash the FINGERPRINT_BYTES bytes that end at offset"""
+    start = max(0, offset - FINGERPRINT_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+class IngestionState:
+    """SQLite-backed watermarks and row content hashes"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS watermarks (
+                source_file TEXT PRIMARY KEY,
+                byte_offset INTEGER,
+                size INTEGER,
+                mtime REAL,
+                fingerprint TEXT
+            );
+            CREATE TABLE IF NOT EXISTS row_hashes (
+                row_key INTEGER PRIMARY KEY,
+                content_hash INTEGER
+            );
+            """)
+        self._pending_hashes = []
+        self._pending_watermark = None
+
+    def reset(self):
+        """Forget everything, so the next run reprocesses the full source"""
+        self.conn.execute("DELETE FROM watermarks")
+        self.conn.execute("DELETE FROM row_hashes")
+        self.conn.commit()
+        logger.info("Cleared incremental ingestion state")
+
+    def watermark(self, source_file):
+        row = self.conn.execute(
+            "SELECT byte_offset, size, mtime, fingerprint FROM watermarks "
+            "WHERE source_file = ?",
+            (str(source_file),),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(["offset", "size", "mtime", "fingerprint"], row))
+
+    def resume_offset(self, source_file):
+        """Byte offset to resume reading from, or 0 for a full rescan
+
+        Returns None when the file has not changed since the last run.
+        """
+        mark = self.watermark(source_file)
+        if mark is None:
+            return 0
+
+        stat = os.stat(source_file)
+        if stat.st_size == mark["size"] and stat.st_mtime == mark["mtime"]:
+            return None
+        if stat.st_size < mark["offset"]:
+            logger.info(f"{source_file} shrank since the last run, rescanning")
+            return 0
+        if file_fingerprint(source_file, mark["offset"]) != mark["fingerprint"]:
+            logger.info(f"{source_file} was rewritten since the last run, rescanning")
+            return 0
+        if stat.st_size == mark["offset"]:
+            return None
+
+        with open(source_file, "rb") as f:
+            f.seek(mark["offset"] - 1)
+            if f.read(1) != b"\n":
+                # The last run ended mid-line, so its boundary can't be trusted
+                return 0
+        return mark["offset"]
+
+    def filter_changed(self, keys, hashes):
+        """Return a boolean mask of rows whose key is new or content changed"""
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS incoming (pos INTEGER, row_key INTEGER, content_hash INTEGER)"
+        )
+        self.conn.execute("DELETE FROM incoming")
+        self.conn.executemany(
+            "INSERT INTO incoming VALUES (?, ?, ?)",
+            zip(range(len(keys)), keys.tolist(), hashes.tolist()),
+        )
+        changed = [
+            pos
+            for (pos,) in self.conn.execute(
+                "SELECT i.pos FROM incoming i LEFT JOIN row_hashes r "
+                "ON i.row_key = r.row_key "
+                "WHERE r.content_hash IS NULL OR r.content_hash != i.content_hash"
+            )
+        ]
+        mask = pd.Series(False, index=keys.index)
+        mask.iloc[changed] = True
+        return mask
+
+    def stage(self, keys, hashes):
+        """Queue row hashes to be recorded once the run succeeds"""
+        self._pending_hashes.append((keys, hashes))
+
+    def stage_watermark(self, source_file, offset):
+        stat = os.stat(source_file)
+        self._pending_watermark = (
+            str(source_file),
+            offset,
+            stat.st_size,
+            stat.st_mtime,
+            file_fingerprint(source_file, offset),
+        )
+
+    def commit(self):
+        """Record the staged watermark and row hashes"""
+        for keys, hashes in self._pending_hashes:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO row_hashes VALUES (?, ?)",
+                zip(keys.tolist(), hashes.tolist()),
+            )
+        if self._pending_watermark is not None:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?, ?)",
+                self._pending_watermark,
+            )
+        self.conn.commit()
+        self._pending_hashes = []
+        self._pending_watermark = None
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,326 @@
+"""Per-stage run metrics and optional profiling for the pipeline
+
+RunMetrics records a step for every pipeline stage and the sub-steps inside
+it: wall time, CPU time, peak RSS, rows in/out and layer bytes read/written.
+Steps nest through a context variable, so a sub-step opened while "silver"
+is running is reported as "silver.parse_dates". The collected steps can be
+written as a JSON run report and as a Prometheus textfile for the
+node_exporter textfile collector.
+
+Stages named in ``profile`` are also run under cProfile (or pyinstrument)
+and their profiles dumped to ``profile_dir``.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# The open steps, outermost first
+_open_steps = contextvars.ContextVar("open_steps", default=())
+
+PROFILERS = ["cprofile", "pyinstrument"]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def instrumented(name):
+    """Run a HealthDataPipeline method as a metrics step
+
+    A DataFrame or int return value is recorded as the step's rows out.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.step(name) as step:
+                result = func(self, *args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    step["rows_out"] = len(result)
+                elif isinstance(result, int):
+                    step["rows_out"] = result
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+class RunMetrics:
+    """Collect timing, memory and I/O figures for each pipeline step"""
+
+    def __init__(self, profile=None, profiler="cprofile", profile_dir="profiles"):
+        if profiler not in PROFILERS:
+            raise ValueError(
+                f"Unknown profiler {profiler!r}, expected one of {PROFILERS}"
+            )
+        self.profile = set(profile or ())
+        self.profiler = profiler
+        self.profile_dir = Path(profile_dir)
+        self.started = datetime.now()
+        self.steps = []
+
+    @contextmanager
+    def step(self, name, rows_in=None):
+        """Measure the enclosed block as step name, nested in the current step"""
+        parents = _open_steps.get()
+        record = {
+            "step": f"{parents[-1]['step']}.{name}" if parents else name,
+            "rows_in": rows_in,
+            "rows_out": None,
+            "bytes_read": 0,
+            "bytes_written": 0,
+        }
+        self.steps.append(record)
+        token = _open_steps.set(parents + (record,))
+        profiler = self._start_profiler(record["step"])
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            # CPU time is process-wide, so it includes stages running concurrently
+            record["wall_seconds"] = round(time.perf_counter() - wall, 4)
+            record["cpu_seconds"] = round(time.process_time() - cpu, 4)
+            record["peak_rss_mb"] = peak_rss_mb()
+            _open_steps.reset(token)
+            if profiler is not None:
+                self._dump_profile(profiler, record["step"])
+
+    def record(self, **values):
+        """Set values on the current step
+
+        Byte counts are added to the current step and every step enclosing it.
+        """
+        steps = _open_steps.get()
+        if not steps:
+            return
+        for key, value in values.items():
+            if key in ("bytes_read", "bytes_written"):
+                for record in steps:
+                    record[key] += value or 0
+            else:
+                steps[-1][key] = value
+
+    def _start_profiler(self, step):
+        if step not in self.profile:
+            return None
+        if self.profiler == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError as e:
+                raise ImportError(
+                    "pyinstrument profiling requires pyinstrument: pip install pyinstrument"
+                ) from e
+            profiler = Profiler()
+            profiler.start()
+        else:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _dump_profile(self, profiler, step):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stamp = self.started.strftime("%Y%m%d_%H%M%S")
+        if self.profiler == "pyinstrument":
+            profiler.stop()
+            path = self.profile_dir / f"{step}_{stamp}.html"
+            path.write_text(profiler.output_html())
+        else:
+            import pstats
+
+            profiler.disable()
+            path = self.profile_dir / f"{step}_{stamp}.prof"
+            profiler.dump_stats(path)
+            with open(path.with_suffix(".txt"), "w") as f:
+                stats = pstats.Stats(profiler, stream=f)
+                stats.sort_stats("cumulative").print_stats(40)
+        logger.info(f"Wrote {self.profiler} profile for {step} to {path}")
+
+    def report(self):
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "peak_rss_mb": peak_rss_mb(),
+            "steps": self.steps,
+        }
+
+    def write_report(self, path):
+        """Write the run report as JSON"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2, default=str))
+        logger.info(f"Wrote run report to {path}")
+        return path
+
+    def write_prometheus(self, path, prefix="healthcare_etl"):
+        """Write the step metrics in the Prometheus textfile format"""
+        metrics = {
+            "wall_seconds": "Wall time of the pipeline step",
+            "cpu_seconds": "Process CPU time during the pipeline step",
+            "peak_rss_mb": "Peak process RSS at the end of the pipeline step",
+            "rows_in": "Rows going into the pipeline step",
+            "rows_out": "Rows coming out of the pipeline step",
+            "bytes_read": "Layer bytes read by the pipeline step",
+            "bytes_written": "Layer bytes written by the pipeline step",
+            "memory_before_mb": "Frame memory before dtype compaction",
+            "memory_after_mb": "Frame memory after dtype compaction",
+            "duplicates": "Duplicate rows removed by the pipeline step",
+        }
+        # A step can run more than once (e.g. per chunk); report one series each
+        totals = {}
+        for record in self.steps:
+            total = totals.setdefault(record["step"], {})
+            for metric in metrics:
+                value = record.get(metric)
+                if value is None:
+                    continue
+                if metric == "peak_rss_mb":
+                    total[metric] = max(total.get(metric, 0), value)
+                else:
+                    total[metric] = round(total.get(metric, 0) + value, 4)
+            rules = total.setdefault("rule_failures", {})
+            for rule, count in record.get("rule_failures", {}).items():
+                rules[rule] = rules.get(rule, 0) + count
+
+        lines = []
+        for metric, help_text in metrics.items():
+            lines.append(f"# HELP {prefix}_step_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_step_{metric} gauge")
+            for step, total in totals.items():
+                if metric in total:
+                    lines.append(
+                        f'{prefix}_step_{metric}{{step="{step}"}} {total[metric]}'
+                    )
+        lines.append(f"# HELP {prefix}_rule_failures Rows failing a data quality rule")
+        lines.append(f"# TYPE {prefix}_rule_failures gauge")
+        for step, total in totals.items():
+            for rule, count in total.get("rule_failures", {}).items():
+                lines.append(
+                    f'{prefix}_rule_failures{{step="{step}",rule="{rule}"}} {count}'
+                )
+        lines.append(
+            f"# HELP {prefix}_last_run_timestamp_seconds Start of the last run"
+        )
+        lines.append(f"# TYPE {prefix}_last_run_timestamp_seconds gauge")
+        lines.append(f"{prefix}_last_run_timestamp_seconds {self.started.timestamp()}")
+
+        # Write then rename, so the collector never reads a partial file
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n")
+        os.replace(tmp, path)
+        return path
+
+
+class MeteredStorage:
+    """Wrap a storage backend to count layer bytes against the current step"""
+
+    def __init__(self, storage, metrics):
+        self.storage = storage
+        self.metrics = metrics
+
+    def __getattr__(self, attr):
+        return getattr(self.storage, attr)
+
+    def _size(self, layer, name, start=None, end=None):
+        return sum(path.stat().st_size for path in self.files(layer, name, start, end))
+
+    def read(self, layer, name, columns=None):
+        df = self.storage.read(layer, name, columns=columns)
+        self.metrics.record(bytes_read=self._size(layer, name))
+        return df
+
+    def read_range(self, layer, name, start=None, end=None, columns=None):
+        df = self.storage.read_range(layer, name, start, end, columns=columns)
+        self.metrics.record(bytes_read=self._size(layer, name, start, end))
+        return df
+
+    def read_partitions(self, layer, name, partitions, columns=None):
+        df = self.storage.read_partitions(layer, name, partitions, columns=columns)
+        if df is not None:
+            size = self._partition_size(layer, name, partitions)
+            self.metrics.record(bytes_read=size)
+        return df
+
+    def write_partitions(self, layer, name, df):
+        written = self.storage.write_partitions(layer, name, df)
+        self.metrics.record(bytes_written=self._partition_size(layer, name, written))
+        return written
+
+    def _partition_size(self, layer, name, partitions):
+        paths = (self.storage.partition_path(layer, name, p) for p in partitions)
+        return sum(path.stat().st_size for path in paths if path.exists())
+
+    def read_chunks(self, layer, name, chunksize, columns=None):
+        self.metrics.record(bytes_read=self._size(layer, name))
+        return self.storage.read_chunks(layer, name, chunksize, columns=columns)
+
+    def write(self, layer, name, df):
+        path = self.storage.write(layer, name, df)
+        self.metrics.record(bytes_written=self._size(layer, name))
+        return path
+
+    def append(self, layer, name, df):
+        before = self._size(layer, name)
+        path = self.storage.append(layer, name, df)
+        self.metrics.record(bytes_written=self._size(layer, name) - before)
+        return path
+
+    def open_writer(self, layer, name):
+        return _MeteredChunkWriter(
+            self.storage.open_writer(layer, name), self, layer, name
+        )
+
+
+class _MeteredChunkWriter:
+    def __init__(self, writer, storage, layer, name):
+        self.writer = writer
+        self.storage = storage
+        self.layer = layer
+        self.name = name
+
+    def write(self, df):
+        self.writer.write(df)
+
+    def close(self):
+        self.writer.close()
+        self.storage.metrics.record(
+            bytes_written=self.storage._size(self.layer, self.name)
+        )
+
+    def discard(self):
+        self.writer.discard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
@@ -0,0 +1,299 @@
+"""Bulk loading of gold DataFrames into MySQL
+
+BulkLoader writes a DataFrame in fixed-size batches, each committed in its
+own transaction. On MySQL it first tries ``LOAD DATA LOCAL INFILE`` from a
+staged file and falls back to multi-row ``executemany`` INSERTs; other
+dialects (SQLite in tests) always use the INSERT path. Upserts use
+``ON DUPLICATE KEY UPDATE`` on MySQL and ``ON CONFLICT ... DO UPDATE`` on
+SQLite.
+
+With ``connections > 1`` loading is overlapped: the calling thread
+serializes batches (staged files or parameter rows) into a bounded queue
+while that many writer threads each take a pooled connection and commit
+batches from it, so the next batch is prepared while the previous ones
+are on the wire and a slow database holds back the producer.
+"""
+
+import csv
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# MySQL error codes for a deadlock and a lock wait timeout; the batch is retried
+RETRYABLE_ERRORS = {1205, 1213}
+
+
+class BulkLoader:
+    """Load DataFrames into database tables in committed batches
+
+    ``connections`` writer threads commit batches concurrently, with at most
+    ``queue_size`` serialized batches waiting for them (twice the number of
+    connections by default). Batches commit in no particular order, so the
+    rows loaded in one call must not repeat a key. SQLite allows a single
+    writer, so it is always loaded over one connection.
+    """
+
+    def __init__(
+        self,
+        engine,
+        batch_size=10_000,
+        use_load_data=True,
+        connections=1,
+        queue_size=None,
+        retries=3,
+    ):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.use_load_data = use_load_data and engine.dialect.name == "mysql"
+        self.connections = 1 if engine.dialect.name == "sqlite" else max(1, connections)
+        self.queue_size = queue_size or 2 * self.connections
+        self.retries = retries
+        self.reports = []
+        self._fallback_lock = threading.Lock()
+
+    def load(self, table, df, upsert=False, key=None):
+        """Insert (or upsert on ``key``) every row of df into table
+
+        An upsert skips rows with a missing ``key`` value: NULLs never match
+        a unique key, so they would be inserted again on every load.
+
+        Returns a report dict with the row count, skipped rows, elapsed
+        seconds, rows/sec, the method used and the number of connections.
+        """
+        start = time.perf_counter()
+        method = "load_data" if self.use_load_data else "executemany"
+
+        skipped = 0
+        if upsert and key:
+            null_key = df[key].isna().any(axis=1)
+            skipped = int(null_key.sum())
+            if skipped:
+                logger.warning(
+                    f"Skipping {skipped} rows of {table} with a missing "
+                    f"{', '.join(key)} value in the upsert"
+                )
+                df = df[~null_key]
+
+        batches = (
+            df.iloc[offset : offset + self.batch_size]
+            for offset in range(0, len(df), self.batch_size)
+        )
+        if self.connections > 1:
+            self._load_overlapped(table, batches, upsert, key)
+        else:
+            for batch in batches:
+                self._write(table, self._serialize(table, batch), upsert, key)
+        if not self.use_load_data:
+            method = "executemany"
+
+        elapsed = time.perf_counter() - start
+        report = {
+            "table": table,
+            "rows": len(df),
+            "skipped": skipped,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(len(df) / elapsed, 1) if elapsed else None,
+            "method": method,
+            "connections": self.connections,
+        }
+        self.reports.append(report)
+        logger.info(
+            f"Loaded {report['rows']} rows into {table} via {method} "
+            f"({report['rows_per_sec']} rows/sec)"
+        )
+        return report
+
+    def _load_overlapped(self, table, batches, upsert, key):
+        """Serialize batches here while the writer threads commit them"""
+        pending = queue.Queue(maxsize=self.queue_size)
+        errors = []
+
+        def writer():
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                if errors:
+                    # Keep draining so the producer never blocks on a full queue
+                    _discard(item)
+                    continue
+                try:
+                    self._write(table, item, upsert, key)
+                except Exception as e:
+                    errors.append(e)
+
+        with ThreadPoolExecutor(
+            max_workers=self.connections, thread_name_prefix=f"load-{table}"
+        ) as pool:
+            writers = [pool.submit(writer) for _ in range(self.connections)]
+            try:
+                for batch in batches:
+                    if errors:
+                        break
+                    pending.put(self._serialize(table, batch))
+            finally:
+                for _ in writers:
+                    pending.put(None)
+        if errors:
+            raise errors[0]
+
+    def _serialize(self, table, batch):
+        """Prepare a batch for a writer: a staged file or parameter rows"""
+        if self.use_load_data:
+            fd, path = tempfile.mkstemp(suffix=".csv", prefix=f"{table}_")
+            os.close(fd)
+            try:
+                stage_file(batch, path)
+            except Exception:
+                os.remove(path)
+                raise
+            return {"batch": batch, "path": path}
+        return {"batch": batch, "records": to_records(batch)}
+
+    def _write(self, table, item, upsert, key):
+        """Commit one serialized batch, retrying deadlocks and lock timeouts"""
+        for attempt in range(self.retries + 1):
+            try:
+                return self._write_once(table, item, upsert, key)
+            except Exception as e:
+                if _error_code(e) not in RETRYABLE_ERRORS or attempt == self.retries:
+                    _discard(item)
+                    raise
+                logger.warning(f"Retrying a batch for {table} after: {str(e)}")
+
+    def _write_once(self, table, item, upsert, key):
+        cols = list(item["batch"].columns)
+        if "path" in item:
+            try:
+                self._load_data_batch(table, item["path"], cols, upsert)
+                _discard(item)
+                return
+            except Exception as e:
+                if _error_code(e) in RETRYABLE_ERRORS:
+                    raise
+                # Usually local_infile disabled on the client or server
+                with self._fallback_lock:
+                    if self.use_load_data:
+                        logger.warning(
+                            f"LOAD DATA LOCAL INFILE failed for {table}, "
+                            f"falling back to executemany: {str(e)}"
+                        )
+                        self.use_load_data = False
+                _discard(item)
+                item = {"batch": item["batch"], "records": to_records(item["batch"])}
+        self._executemany_batch(table, cols, item["records"], upsert, key)
+
+    def _executemany_batch(self, table, cols, records, upsert, key):
+        query = text(self._insert_statement(table, cols, upsert, key))
+        with self.engine.begin() as conn:
+            conn.execute(query, records)
+
+    def _insert_statement(self, table, cols, upsert, key):
+        query = (
+            f"INSERT INTO {table} ({', '.join(cols)}) "
+            f"VALUES ({', '.join(':' + col for col in cols)})"
+        )
+        if not upsert:
+            return query
+        if self.engine.dialect.name == "mysql":
+            return (
+                query
+                + " ON DUPLICATE KEY UPDATE "
+                + ", ".join(f"{col} = VALUES({col})" for col in cols)
+            )
+        if not key:
+            raise ValueError(
+                f"Upserting into {table} needs key columns on this dialect"
+            )
+        updates = [col for col in cols if col not in key]
+        action = (
+            "DO UPDATE SET " + ", ".join(f"{col} = excluded.{col}" for col in updates)
+            if updates
+            else "DO NOTHING"
+        )
+        return query + f" ON CONFLICT ({', '.join(key)}) {action}"
+
+    def _load_data_batch(self, table, path, cols, upsert):
+        target = f"{table}_upsert" if upsert else table
+        load = (
+            f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {target} "
+            f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            f"ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({', '.join(cols)})"
+        )
+        with self.engine.begin() as conn:
+            if not upsert:
+                conn.execute(text(load))
+                return
+            # Land the batch in a session-scoped copy, then merge it
+            conn.execute(text(f"CREATE TEMPORARY TABLE {target} LIKE {table}"))
+            conn.execute(text(load))
+            conn.execute(
+                text(
+                    f"INSERT INTO {table} ({', '.join(cols)}) "
+                    f"SELECT {', '.join(cols)} FROM {target} "
+                    f"ON DUPLICATE KEY UPDATE "
+                    + ", ".join(f"{col} = VALUES({col})" for col in cols)
+                )
+            )
+            conn.execute(text(f"DROP TEMPORARY TABLE {target}"))
+
+
+def _error_code(error):
+    """The driver's error code behind a SQLAlchemy error, if any"""
+    args = getattr(getattr(error, "orig", None), "args", None)
+    return args[0] if args else None
+
+
+def _discard(item):
+    """Remove the staged file of a serialized batch, if it has one"""
+    if "path" in item:
+        try:
+            os.remove(item["path"])
+        except FileNotFoundError:
+            pass
+
+
+def to_records(df):
+    """Convert df to parameter dicts with None for nulls and native types"""
+    columns = []
+    for col in df.columns:
+        values = df[col].astype(object).where(df[col].notna(), None).tolist()
+        # Drivers (sqlite3 in particular) want datetime.datetime, not Timestamp
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            values = [None if v is None else v.to_pydatetime() for v in values]
+        columns.append(values)
+    names = list(df.columns)
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def stage_file(df, path):
+    """Write df as a LOAD DATA compatible CSV (\\N for NULL, 1/0 booleans)"""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+        kind = pd.api.types.infer_dtype(df[col], skipna=True)
+        if kind == "boolean":
+            # Strings, so a column with nulls doesn't turn into 1.0/0.0
+            df[col] = df[col].map({True: "1", False: "0"})
+        elif kind == "string":
+            # Backslash is LOAD DATA's escape character
+            df[col] = df[col].str.replace("\\", "\\\\", regex=False)
+    df.to_csv(
+        path,
+        index=False,
+        header=False,
+        na_rep="\\N",
+        quoting=csv.QUOTE_MINIMAL,
+        lineterminator="\n",
+        date_format="%Y-%m-%d %H:%M:%S",
+    )
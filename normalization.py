@@ -0,0 +1,81 @@
+"""Rule-driven text normalization for the silver layer
+
+Each column's TextRule says how its values are cleaned: strip surrounding
+whitespace, treat null tokens such as "NULL" or "N/A" as missing, casefold,
+and map the result onto a fixed vocabulary. normalize_column() applies the
+rule to the column's distinct values only and maps the row codes back, so
+the cost grows with the number of distinct values rather than with rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Source values that mean "no value"; matched ignoring case and whitespace
+NULL_TOKENS = ("", "NULL", "N/A", "Unknown")
+
+
+class TextRule:
+    """How to normalize one text column
+
+    Values are stripped (``strip``), nulled if they are one of
+    ``null_tokens``, casefolded (``casefold``) and finally looked up in
+    ``mapping``, if given; values missing from the mapping become null.
+    Mapping keys must therefore be casefolded when ``casefold`` is set.
+    """
+
+    def __init__(
+        self, strip=True, casefold=False, mapping=None, null_tokens=NULL_TOKENS
+    ):
+        self.strip = strip
+        self.casefold = casefold
+        self.mapping = mapping
+        self.null_tokens = frozenset(token.casefold() for token in null_tokens)
+
+    def apply(self, value):
+        """Normalize one non-null value"""
+        text = str(value)
+        if self.strip:
+            text = text.strip()
+        if text.strip().casefold() in self.null_tokens:
+            return np.nan
+        if self.casefold:
+            text = text.casefold()
+        if self.mapping is not None:
+            return self.mapping.get(text, np.nan)
+        return text
+
+    def __repr__(self):
+        return (
+            f"TextRule(strip={self.strip}, casefold={self.casefold}, "
+            f"mapping={self.mapping!r})"
+        )
+
+
+def _per_unique(values, func, missing):
+    """Evaluate func once per distinct value of values and broadcast it back"""
+    codes, uniques = pd.factorize(values)
+    # Missing values get code -1, which picks the trailing ``missing``
+    results = np.array([func(value) for value in uniques] + [missing], dtype=object)
+    return results[codes]
+
+
+def normalize_column(values, rule):
+    """Return values (a Series) normalized by rule"""
+    normalized = _per_unique(values, rule.apply, np.nan)
+    return pd.Series(normalized, index=values.index, name=values.name).infer_objects()
+
+
+def normalize_text(df, rules):
+    """Normalize each column of df that has a rule in rules, in place"""
+    for col, rule in rules.items():
+        df[col] = normalize_column(df[col], rule)
+    return df
+
+
+def null_token_mask(values, null_tokens=NULL_TOKENS):
+    """Boolean mask of the values that are one of null_tokens"""
+    tokens = frozenset(token.casefold() for token in null_tokens)
+    hits = _per_unique(
+        values, lambda value: str(value).strip().casefold() in tokens, False
+    )
+    return pd.Series(hits.astype(bool), index=values.index)
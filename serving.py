@@ -0,0 +1,121 @@
+"""Pre-aggregated serving tables for the dashboard
+
+The dashboard's charts only need counts, so the pipeline aggregates the
+gold tables once per run instead of the dashboard regrouping every
+appointment on each page interaction. appointment_counts is kept at
+day x hour x doctor grain, which is enough to apply the dashboard's doctor
+and date filters and still build the heatmap, weekly and per-doctor views.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+SERVING_TABLES = [
+    "appointment_counts",
+    "patient_ages",
+    "gender_counts",
+    "specialty_counts",
+]
+
+
+def appointment_counts(appointments, doctors):
+    """Appointments per day, hour and doctor"""
+    when = pd.to_datetime(appointments["Appointment date time"], format="ISO8601")
+    counts = (
+        pd.DataFrame(
+            {
+                "appointment_date": when.dt.normalize(),
+                "hour": when.dt.hour,
+                "doctor_id": appointments["doctor_id"],
+            }
+        )
+        .groupby(["appointment_date", "hour", "doctor_id"], observed=True)
+        .size()
+        .reset_index(name="appointments")
+    )
+    counts["hour"] = counts["hour"].astype(int)
+    counts["day_of_week"] = counts["appointment_date"].dt.day_name()
+    counts["week"] = counts["appointment_date"].dt.isocalendar().week.astype(int)
+    names = doctors[["doctor_id", "Doctor name", "Doctor specialty"]].rename(
+        columns={"Doctor name": "doctor_name", "Doctor specialty": "doctor_specialty"}
+    )
+    return counts.merge(names, on="doctor_id", how="left")
+
+
+def patient_ages(patients, today=None):
+    """Patients per age in years (by birth year) as of today"""
+    today = today or datetime.date.today()
+    dob = pd.to_datetime(patients["Patint DOB"], format="ISO8601", errors="coerce")
+    ages = (today.year - dob.dt.year).dropna().astype(int)
+    counts = ages.value_counts().sort_index().rename_axis("age")
+    return counts.reset_index(name="patients")
+
+
+def _value_counts(df, column, name, label):
+    counts = df[column].value_counts(sort=False).rename_axis(name)
+    return counts[counts > 0].reset_index(name=label)
+
+
+def build_serving_tables(patients, doctors, appointments, today=None):
+    """Return each serving table, by name, built from the gold tables"""
+    return {
+        "appointment_counts": appointment_counts(appointments, doctors),
+        "patient_ages": patient_ages(patients, today),
+        "gender_counts": _value_counts(
+            patients, "Patient Gendr", "patient_gendr", "patients"
+        ),
+        "specialty_counts": _value_counts(
+            doctors, "Doctor specialty", "doctor_specialty", "doctors"
+        ),
+    }
+
+
+class DoctorDateIndex:
+    """Doctor and date-range lookups over a frame, built once at load time
+
+    Rows are sorted by doctor, then date, so each doctor's rows form one
+    contiguous, date-sorted range: a doctor's date-range filter is two
+    binary searches and a slice. Filters across all doctors go through a
+    date-sorted row order instead. Either way only the selected rows are
+    touched, never the whole frame.
+    """
+
+    def __init__(self, df, date_column, doctor_column="doctor_name"):
+        df = df.sort_values([doctor_column, date_column], kind="stable")
+        self.df = df.reset_index(drop=True)
+        self.dates = self.df[date_column].to_numpy()
+        self.date_order = np.argsort(self.dates, kind="stable")
+        self.sorted_dates = self.dates[self.date_order]
+        valid = self.sorted_dates[~pd.isna(self.sorted_dates)]
+        self.date_range = (
+            (pd.Timestamp(valid[0]), pd.Timestamp(valid[-1]))
+            if len(valid)
+            else (None, None)
+        )
+
+        doctors = self.df[doctor_column]
+        starts = np.flatnonzero(doctors.ne(doctors.shift()).to_numpy())
+        stops = np.append(starts[1:], len(doctors))
+        self.ranges = {
+            doctors.iat[start]: (start, stop)
+            for start, stop in zip(starts, stops)
+            if pd.notna(doctors.iat[start])
+        }
+
+    def select(self, doctor=None, start=None, end=None):
+        """Rows for doctor (all doctors if None) with start <= date < end"""
+        if doctor is None:
+            lo, hi = self._bounds(self.sorted_dates, start, end)
+            return self.df.iloc[self.date_order[lo:hi]]
+        first, last = self.ranges.get(doctor, (0, 0))
+        lo, hi = self._bounds(self.dates[first:last], start, end)
+        return self.df.iloc[first + lo : first + hi]
+
+    @staticmethod
+    def _bounds(dates, start, end):
+        # Missing dates sort last, so searching for NaT finds where they begin
+        lo = 0 if start is None else dates.searchsorted(np.datetime64(start), "left")
+        end = np.datetime64("NaT") if end is None else np.datetime64(end)
+        return lo, dates.searchsorted(end, "left")
@@ -0,0 +1,105 @@
+"""In-memory stage graph for running the pipeline in one pass
+
+Stages are named functions that receive the results of the stages they run
+after, so DataFrames flow straight from one stage to the next instead of
+being re-read from the layer files. Stages whose dependencies are done run
+concurrently on a thread pool. A run can resume from any stage whose output
+was persisted: only the stages downstream of it run, and the outputs they
+need from the skipped stages are restored from storage.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# Returned by a stage to stop everything downstream of it
+HALT = object()
+
+
+class StageGraph:
+    """Run named stages in dependency order, concurrently where possible"""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self.stages = {}
+
+    def add(self, name, func, after=(), restore=None):
+        """Register a stage
+
+        ``func`` is called with the results of the ``after`` stages, in that
+        order. ``restore`` loads the stage's persisted output and is needed
+        for stages a run may resume from.
+        """
+        for dep in after:
+            if dep not in self.stages:
+                raise ValueError(f"Stage {name!r} depends on unknown stage {dep!r}")
+        self.stages[name] = {"func": func, "after": list(after), "restore": restore}
+
+    def downstream(self, name):
+        """Return every stage that depends on name, directly or not"""
+        found = set()
+        for other, stage in self.stages.items():
+            if name in stage["after"]:
+                found |= {other} | self.downstream(other)
+        return found
+
+    def run(self, resume_from=None):
+        """Run the graph and return each executed or restored stage's result"""
+        results = {}
+        skipped = set()
+        if resume_from is not None:
+            if resume_from not in self.stages:
+                raise ValueError(
+                    f"Unknown stage {resume_from!r}, expected one of {list(self.stages)}"
+                )
+            skipped = set(self.stages) - self.downstream(resume_from)
+            needed = {
+                dep
+                for name, stage in self.stages.items()
+                if name not in skipped
+                for dep in stage["after"]
+                if dep in skipped
+            }
+            for name in needed:
+                restore = self.stages[name]["restore"]
+                if restore is None:
+                    raise ValueError(f"Stage {name!r} can't be resumed from storage")
+                logger.info(f"Restoring {name} from storage")
+                results[name] = restore()
+
+        pending = [name for name in self.stages if name not in skipped]
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.stages[name]["after"]
+                    if all(dep in results for dep in deps):
+                        pending.remove(name)
+                        if any(results[dep] is HALT for dep in deps):
+                            results[name] = HALT
+                            continue
+                        args = [results[dep] for dep in deps]
+                        running[pool.submit(self._run_stage, name, args)] = name
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        # Let stages already running finish, but start no more
+                        pending.clear()
+                        for other in running:
+                            other.cancel()
+                        raise
+        return results
+
+    def _run_stage(self, name, args):
+        start = time.perf_counter()
+        result = self.stages[name]["func"](*args)
+        logger.info(f"Stage {name} finished in {time.perf_counter() - start:.2f}s")
+        return result
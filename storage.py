@@ -0,0 +1,634 @@
+"""Storage backends for the bronze/silver/gold/rejected layers
+
+Every layer file is addressed by ``(layer, name)``, e.g. ``("gold",
+"appointments")``. CSV keeps the original on-disk format; Parquet stores
+each table with the types declared in LAYER_SCHEMAS so downstream stages
+and the dashboard no longer re-parse text or re-infer types.
+
+Tables in PARTITIONED_TABLES are stored as one file per calendar month of
+their date column, under ``year=YYYY/month=MM/`` directories (rows without
+a date go to the ``__HIVE_DEFAULT_PARTITION__`` directories). read_range()
+only opens the months overlapping a date range, and write_partitions()
+rewrites just the months a frame has rows for.
+
+Whole files are written next to their destination and renamed into place,
+so a crash mid-write leaves the previous version of the file.
+"""
+
+import contextvars
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SOURCE_TEXT_COLUMNS = [
+    "Patient Name",
+    "Patint DOB",
+    "Patient Gendr",
+    "Appointment date time",
+    "Doctor name",
+    "Doctor specialty",
+    "Appointment location",
+    "Reason for visit",
+    "Note",
+    "Follow up",
+]
+
+SILVER_SCHEMA = {
+    "Patient Name": "string",
+    "Patint DOB": "datetime",
+    "Patient Gendr": "category",
+    "Appointment date time": "datetime",
+    "Doctor name": "category",
+    "Doctor specialty": "category",
+    "Appointment location": "category",
+    "Reason for visit": "category",
+    "Note": "string",
+    "Follow up": "bool",
+    "ingestion_date": "datetime",
+    "source_file": "category",
+}
+
+# Column types per (layer, name); columns not listed keep their inferred type
+LAYER_SCHEMAS = {
+    ("bronze", "raw_health_data"): {
+        **{col: "string" for col in SOURCE_TEXT_COLUMNS},
+        "ingestion_date": "datetime",
+        "source_file": "string",
+    },
+    ("silver", "cleaned_health_data"): SILVER_SCHEMA,
+    ("rejected", "rejected_records"): {**SILVER_SCHEMA, "failed_rules": "string"},
+    ("gold", "patients"): {
+        "Patient Name": "string",
+        "Patint DOB": "datetime",
+        "Patient Gendr": "category",
+        "patient_id": "string",
+    },
+    ("gold", "doctors"): {
+        "Doctor name": "string",
+        "Doctor specialty": "category",
+        "doctor_id": "int",
+    },
+    ("gold", "appointments"): {
+        "patient_id": "string",
+        "doctor_id": "int",
+        "Appointment date time": "datetime",
+        "Appointment location": "category",
+        "Reason for visit": "category",
+        "Note": "string",
+        "Follow up": "bool",
+    },
+}
+
+# Tables stored in month partitions, by (layer, name) -> date column
+PARTITIONED_TABLES = {("gold", "appointments"): "Appointment date time"}
+
+# Partition directory value for rows without a date, as Hive names it
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Gold column -> column name in the MySQL tables (and the analytics views)
+SQL_COLUMNS = {
+    "patients": {
+        "patient_id": "patient_id",
+        "Patient Name": "patient_name",
+        "Patint DOB": "date_of_birth",
+        "Patient Gendr": "gender",
+    },
+    "doctors": {
+        "doctor_id": "doctor_id",
+        "Doctor name": "doctor_name",
+        "Doctor specialty": "specialty",
+    },
+    "appointments": {
+        "patient_id": "patient_id",
+        "doctor_id": "doctor_id",
+        "Appointment date time": "appointment_datetime",
+        "Appointment location": "location",
+        "Reason for visit": "reason",
+        "Note": "notes",
+        "Follow up": "follow_up",
+    },
+}
+
+
+def partition_names(dates):
+    """Return the month partition (e.g. "year=2021/month=05") of each date"""
+    dates = pd.to_datetime(pd.Series(dates))
+    keys = (dates.dt.year * 100 + dates.dt.month).fillna(-1).astype(int).to_numpy()
+    uniques, codes = np.unique(keys, return_inverse=True)
+    names = [
+        (
+            f"year={NULL_PARTITION}/month={NULL_PARTITION}"
+            if key < 0
+            else f"year={key // 100}/month={key % 100:02d}"
+        )
+        for key in uniques
+    ]
+    return np.array(names, dtype=object)[codes]
+
+
+def split_partitions(df, date_column):
+    """Yield ``(partition, rows)`` for each month partition df has rows in"""
+    names = partition_names(df[date_column])
+    for partition, rows in pd.Series(names).groupby(names).indices.items():
+        yield partition, df.iloc[rows]
+
+
+def partition_overlaps(partition, start=None, end=None):
+    """Whether a month partition can hold dates with start <= date < end"""
+    if start is None and end is None:
+        return True
+    year, month = (part.split("=", 1)[1] for part in partition.split("/"))
+    if year == NULL_PARTITION:
+        return False
+    first = pd.Timestamp(int(year), int(month), 1)
+    return (end is None or first < pd.Timestamp(end)) and (
+        start is None or first + pd.offsets.MonthBegin() > pd.Timestamp(start)
+    )
+
+
+class CsvStorage:
+    """Plain CSV files, as the pipeline has always written them"""
+
+    format = "csv"
+    suffix = ".csv"
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+
+    def path(self, layer, name):
+        """The table's file, or its directory for a partitioned table"""
+        if (layer, name) in PARTITIONED_TABLES:
+            return self.output_dir / layer / name
+        return self._file_path(layer, name)
+
+    def _file_path(self, layer, name):
+        # Also where partitioned tables were kept as a single file
+        return self.output_dir / layer / f"{name}{self.suffix}"
+
+    def partition_path(self, layer, name, partition):
+        return self.path(layer, name) / partition / f"part{self.suffix}"
+
+    def partitions(self, layer, name, start=None, end=None):
+        """Stored partitions of a partitioned table overlapping [start, end)"""
+        root = self.path(layer, name)
+        found = sorted(
+            path.parent.relative_to(root).as_posix()
+            for path in root.glob(f"year=*/month=*/part{self.suffix}")
+        )
+        return [p for p in found if partition_overlaps(p, start, end)]
+
+    def files(self, layer, name, start=None, end=None):
+        """The files holding a table, pruned to the partitions in [start, end)"""
+        if (layer, name) in PARTITIONED_TABLES and self.path(layer, name).exists():
+            return [
+                self.partition_path(layer, name, partition)
+                for partition in self.partitions(layer, name, start, end)
+            ]
+        path = self._file_path(layer, name)
+        return [path] if path.exists() else []
+
+    def version(self, layer, name):
+        """Latest mtime, total size and file count of a table, or None if missing"""
+        stats = [path.stat() for path in self.files(layer, name)]
+        if not stats:
+            return None
+        return (
+            max(stat.st_mtime_ns for stat in stats),
+            sum(stat.st_size for stat in stats),
+            len(stats),
+        )
+
+    def exists(self, layer, name):
+        return bool(self.files(layer, name))
+
+    def read(self, layer, name, columns=None):
+        if (layer, name) in PARTITIONED_TABLES:
+            return self.read_range(layer, name, columns=columns)
+        return self._read_file(self.path(layer, name), columns)
+
+    def read_range(self, layer, name, start=None, end=None, columns=None):
+        """Read the rows of a partitioned table with start <= date < end
+
+        Only the month partitions overlapping the range are opened; either
+        bound may be None.
+        """
+        date_column = PARTITIONED_TABLES[(layer, name)]
+        # With no month in range, read one partition for the table's columns
+        files = self.files(layer, name, start, end) or self.files(layer, name)[:1]
+        if not files:
+            raise FileNotFoundError(f"No data found at {self.path(layer, name)}")
+        read_columns = columns
+        if columns is not None and date_column not in columns:
+            read_columns = [*columns, date_column]
+        df = self._concat(
+            [self._read_file(path, read_columns) for path in files], layer, name
+        )
+        if start is not None or end is not None:
+            dates = pd.to_datetime(df[date_column], format="ISO8601")
+            keep = dates.notna()
+            if start is not None:
+                keep &= dates >= pd.Timestamp(start)
+            if end is not None:
+                keep &= dates < pd.Timestamp(end)
+            df = df[keep.to_numpy()].reset_index(drop=True)
+        return df if columns is None else df[columns]
+
+    def read_partitions(self, layer, name, partitions, columns=None):
+        """Read the given partitions of a partitioned table (None if none exist)"""
+        legacy = self._file_path(layer, name)
+        if legacy.exists() and not self.path(layer, name).exists():
+            df = self._read_file(legacy, columns)
+            names = partition_names(df[PARTITIONED_TABLES[(layer, name)]])
+            return df[np.isin(names, list(partitions))].reset_index(drop=True)
+        frames = [
+            self._read_file(path, columns)
+            for path in (self.partition_path(layer, name, p) for p in partitions)
+            if path.exists()
+        ]
+        return self._concat(frames, layer, name) if frames else None
+
+    def _read_file(self, path, columns=None):
+        return pd.read_csv(path, usecols=columns)
+
+    def _concat(self, frames, layer, name):
+        return pd.concat(frames, ignore_index=True)
+
+    def read_chunks(self, layer, name, chunksize, columns=None):
+        """Yield a layer table as DataFrames of up to chunksize rows"""
+        for path in self.files(layer, name):
+            with pd.read_csv(path, usecols=columns, chunksize=chunksize) as reader:
+                yield from reader
+
+    def write(self, layer, name, df):
+        if (layer, name) in PARTITIONED_TABLES:
+            written = self._write_partition_files(layer, name, df)
+            # Drop the months df has no rows for once the new ones are in place
+            for partition in set(self.partitions(layer, name)) - set(written):
+                shutil.rmtree(self.path(layer, name) / partition)
+            self._file_path(layer, name).unlink(missing_ok=True)
+            return self.path(layer, name)
+        path = self.path(layer, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._replace_file(path, df, layer, name)
+        return path
+
+    def write_partitions(self, layer, name, df):
+        """Replace the partitions df has rows for, leaving the others as they are
+
+        Returns the partitions written.
+        """
+        legacy = self._file_path(layer, name)
+        if legacy.exists() and not self.path(layer, name).exists():
+            # Split a table written before partitioning before replacing parts
+            self.write(layer, name, self._read_file(legacy))
+        return self._write_partition_files(layer, name, df)
+
+    def _write_partition_files(self, layer, name, df):
+        written = []
+        for partition, rows in split_partitions(df, PARTITIONED_TABLES[(layer, name)]):
+            path = self.partition_path(layer, name, partition)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._replace_file(path, rows, layer, name)
+            written.append(partition)
+        return written
+
+    def _replace_file(self, path, df, layer, name):
+        """Write df to a temporary file beside path and rename it over path"""
+        tmp = path.with_name(f"{path.name}.tmp")
+        try:
+            self._write_file(tmp, df, layer, name)
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def _write_file(self, path, df, layer, name):
+        df.to_csv(path, index=False)
+
+    def append(self, layer, name, df):
+        """Add rows to a layer table, creating it if needed"""
+        if (layer, name) in PARTITIONED_TABLES:
+            # Only the partitions df has rows for are rewritten
+            existing = self.read_partitions(
+                layer, name, set(partition_names(df[PARTITIONED_TABLES[(layer, name)]]))
+            )
+            if existing is not None:
+                df = pd.concat([existing, df], ignore_index=True)
+            self.write_partitions(layer, name, df)
+            return self.path(layer, name)
+        path = self.path(layer, name)
+        if not path.exists():
+            return self.write(layer, name, df)
+        df.to_csv(path, mode="a", header=False, index=False)
+        return path
+
+    def open_writer(self, layer, name):
+        """Return a writer that appends DataFrame chunks to one file"""
+        return _CsvChunkWriter(self.path(layer, name))
+
+    def export_csv(self, layer, name, path=None):
+        """Write a layer table as CSV, by default next to the stored file"""
+        source = self.path(layer, name)
+        path = Path(path) if path else source.with_suffix(".csv")
+        if path != source:
+            self.read(layer, name).to_csv(path, index=False)
+        return path
+
+
+class ParquetStorage(CsvStorage):
+    """Typed, columnar Parquet files written through pyarrow"""
+
+    format = "parquet"
+    suffix = ".parquet"
+
+    def __init__(self, output_dir):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "Parquet storage requires pyarrow: pip install pyarrow"
+            ) from e
+        super().__init__(output_dir)
+
+    def _read_file(self, path, columns=None):
+        import pyarrow.parquet as pq
+
+        return _from_arrow(pd.read_parquet(path, columns=columns), pq.read_schema(path))
+
+    def _concat(self, frames, layer, name):
+        df = pd.concat(frames, ignore_index=True)
+        # Categories differ between files, which concat turns into objects
+        for col, kind in LAYER_SCHEMAS.get((layer, name), {}).items():
+            if kind == "category" and col in df.columns:
+                df[col] = df[col].astype("category")
+        return df
+
+    def read_chunks(self, layer, name, chunksize, columns=None):
+        import pyarrow.parquet as pq
+
+        for path in self.files(layer, name):
+            parquet_file = pq.ParquetFile(path)
+            batches = parquet_file.iter_batches(batch_size=chunksize, columns=columns)
+            for batch in batches:
+                yield _from_arrow(batch.to_pandas(), parquet_file.schema_arrow)
+
+    def _write_file(self, path, df, layer, name):
+        import pyarrow.parquet as pq
+
+        pq.write_table(to_arrow(df, LAYER_SCHEMAS.get((layer, name), {})), path)
+
+    def append(self, layer, name, df):
+        if (layer, name) in PARTITIONED_TABLES:
+            return super().append(layer, name, df)
+        # Parquet files can't be appended to in place, so rewrite the table
+        if self.exists(layer, name):
+            df = pd.concat([self.read(layer, name), df], ignore_index=True)
+        return self.write(layer, name, df)
+
+    def open_writer(self, layer, name):
+        return _ParquetChunkWriter(
+            self.path(layer, name), LAYER_SCHEMAS.get((layer, name), {})
+        )
+
+
+class BackgroundStorage:
+    """Wrap a backend so layer writes happen on a background writer thread
+
+    ``write`` queues the table and returns immediately; reads and other
+    calls on a table wait for its queued writes first, so callers see the
+    same files as with the wrapped backend. Frames handed to ``write`` must
+    not be modified afterwards. Errors surface on the next call touching the
+    table, or on ``flush``.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="layer-writer"
+        )
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        return getattr(self.storage, attr)
+
+    def write(self, layer, name, df):
+        # Run in the caller's context so metrics land on the calling stage
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, self.storage.write, layer, name, df)
+        with self._lock:
+            self._pending.setdefault((layer, name), []).append(future)
+        return self.storage.path(layer, name)
+
+    def _wait(self, layer, name):
+        with self._lock:
+            futures = self._pending.pop((layer, name), [])
+        for future in futures:
+            future.result()
+
+    def exists(self, layer, name):
+        self._wait(layer, name)
+        return self.storage.exists(layer, name)
+
+    def read(self, layer, name, columns=None):
+        self._wait(layer, name)
+        return self.storage.read(layer, name, columns=columns)
+
+    def read_chunks(self, layer, name, chunksize, columns=None):
+        self._wait(layer, name)
+        return self.storage.read_chunks(layer, name, chunksize, columns=columns)
+
+    def read_range(self, layer, name, start=None, end=None, columns=None):
+        self._wait(layer, name)
+        return self.storage.read_range(layer, name, start, end, columns=columns)
+
+    def read_partitions(self, layer, name, partitions, columns=None):
+        self._wait(layer, name)
+        return self.storage.read_partitions(layer, name, partitions, columns=columns)
+
+    def write_partitions(self, layer, name, df):
+        self._wait(layer, name)
+        return self.storage.write_partitions(layer, name, df)
+
+    def partitions(self, layer, name, start=None, end=None):
+        self._wait(layer, name)
+        return self.storage.partitions(layer, name, start, end)
+
+    def files(self, layer, name, start=None, end=None):
+        self._wait(layer, name)
+        return self.storage.files(layer, name, start, end)
+
+    def version(self, layer, name):
+        self._wait(layer, name)
+        return self.storage.version(layer, name)
+
+    def append(self, layer, name, df):
+        self._wait(layer, name)
+        return self.storage.append(layer, name, df)
+
+    def open_writer(self, layer, name):
+        self._wait(layer, name)
+        return self.storage.open_writer(layer, name)
+
+    def export_csv(self, layer, name, path=None):
+        self._wait(layer, name)
+        return self.storage.export_csv(layer, name, path)
+
+    def flush(self):
+        """Wait for every queued write, raising the first error"""
+        with self._lock:
+            keys = list(self._pending)
+        for layer, name in keys:
+            self._wait(layer, name)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
+
+
+class _CsvChunkWriter:
+    """Write chunks to a temporary file that replaces path on close"""
+
+    def __init__(self, path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = path.with_name(f"{path.name}.tmp")
+        self._first = True
+
+    def write(self, df):
+        df.to_csv(
+            self.tmp_path,
+            mode="w" if self._first else "a",
+            header=self._first,
+            index=False,
+        )
+        self._first = False
+
+    def _close_file(self):
+        pass
+
+    def close(self):
+        self._close_file()
+        if self.tmp_path.exists():
+            os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        """Drop what was written, leaving the previous file in place"""
+        self._close_file()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class _ParquetChunkWriter(_CsvChunkWriter):
+    def __init__(self, path, schema):
+        super().__init__(path)
+        self.schema = schema
+        self._writer = None
+
+    def write(self, df):
+        import pyarrow.parquet as pq
+
+        table = to_arrow(df, self.schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+        else:
+            # Later chunks must match the schema fixed by the first one
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def _close_file(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _from_arrow(df, arrow_schema):
+    """Make a frame read from Parquet look like one read from CSV"""
+    import pyarrow as pa
+
+    # Missing text comes back as None; use NaN like the CSV reader does
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    # List cells come back as arrays; keep them as plain lists
+    for field in arrow_schema:
+        if pa.types.is_list(field.type) and field.name in df.columns:
+            df[field.name] = df[field.name].map(
+                lambda v: v.tolist() if isinstance(v, np.ndarray) else v
+            )
+    return df
+
+
+def apply_schema(df, schema):
+    """Cast DataFrame columns to the pandas dtypes declared in schema"""
+    df = df.copy()
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        if kind == "datetime":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif kind == "bool":
+            df[col] = df[col].astype("boolean")
+        elif kind == "category":
+            df[col] = df[col].astype("category")
+        elif kind == "int":
+            df[col] = df[col].astype("Int64")
+        elif kind == "string":
+            # Values pandas inferred as bools or numbers are written as text
+            values = df[col]
+            df[col] = values.astype(str).astype(object).where(values.notna(), None)
+    return df
+
+
+def to_arrow(df, schema):
+    """Convert a DataFrame to a pyarrow Table with the declared types"""
+    import pyarrow as pa
+
+    arrow_types = {
+        "datetime": pa.timestamp("ns"),
+        "bool": pa.bool_(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+        "int": pa.int64(),
+        "string": pa.string(),
+    }
+    df = apply_schema(df, schema)
+    fields = []
+    for col in df.columns:
+        if col in schema:
+            fields.append(pa.field(col, arrow_types[schema[col]]))
+        else:
+            inferred = pa.Schema.from_pandas(df[[col]], preserve_index=False)
+            fields.append(inferred.field(col))
+    return pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+
+STORAGE_BACKENDS = {"csv": CsvStorage, "parquet": ParquetStorage}
+
+
+def get_storage(fmt, output_dir):
+    """Return the storage backend for "csv" or "parquet" """
+    try:
+        return STORAGE_BACKENDS[fmt](output_dir)
+    except KeyError:
+        raise ValueError(
+            f"Unknown storage format {fmt!r}, expected one of {list(STORAGE_BACKENDS)}"
+        )
+
+
+def detect_storage(output_dir):
+    """Pick the backend that wrote the gold layer in output_dir"""
+    parquet = Path(output_dir) / "gold" / f"patients{ParquetStorage.suffix}"
+    return get_storage("parquet" if parquet.exists() else "csv", output_dir)
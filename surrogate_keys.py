@@ -0,0 +1,104 @@
+"""Batch surrogate key generation for the gold layer
+
+Keys are built from whole columns at once: each row's key string is
+``"<col1>_<col2>_..."`` with every value formatted the way ``str()`` formats
+it, which is what the pipeline's original per-row md5 hashed. With
+``algorithm="md5"`` and no salt the resulting IDs are identical to the ones
+the pipeline has always produced.
+
+A salt turns the digest into a keyed hash (HMAC-MD5, or BLAKE2b's native
+key), so IDs can't be recomputed from a patient's name and birth date
+without it. xxhash is much faster but is not a cryptographic hash; a salt
+only seeds it, so use md5 or blake2b when IDs must stay pseudonymous.
+
+factorize_keys maps composite natural keys to integer codes, so the gold
+tables can be deduplicated and their foreign keys assigned by array
+indexing instead of multi-column string joins.
+"""
+
+import hashlib
+import hmac
+
+import numpy as np
+import pandas as pd
+
+HASH_ALGORITHMS = ["md5", "blake2b", "xxhash"]
+
+
+def key_strings(df, columns, sep="_"):
+    """Join the str() form of each row's values in columns"""
+    parts = [_column_strings(df[col]) for col in columns]
+    keys = parts[0]
+    for part in parts[1:]:
+        keys = keys + sep + part
+    return keys
+
+
+def _column_strings(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # Few distinct dates, so format each one once; str(NaT) is "NaT"
+        codes, uniques = pd.factorize(series)
+        strings = np.array([str(value) for value in uniques] + ["NaT"], dtype=object)
+        return strings[codes]
+    # numpy's astype(str) calls str() on each value, so None stays "None"
+    # and NaN "nan"; pandas' own astype(str) keeps them missing on pandas 3
+    return series.to_numpy(dtype=object).astype(str).astype(object)
+
+
+def hash_keys(keys, algorithm="md5", salt=None):
+    """Return the 32 character hex digest of each key string"""
+    if algorithm not in HASH_ALGORITHMS:
+        raise ValueError(
+            f"Unknown key algorithm {algorithm!r}, expected one of {HASH_ALGORITHMS}"
+        )
+    if isinstance(salt, str):
+        salt = salt.encode()
+
+    if algorithm == "md5":
+        if salt:
+            # Key the HMAC once and copy its state for every row
+            keyed = hmac.new(salt, digestmod="md5")
+            return [_hmac_hexdigest(keyed, k) for k in keys]
+        return [hashlib.md5(k.encode()).hexdigest() for k in keys]
+
+    if algorithm == "blake2b":
+        blake2b = hashlib.blake2b
+        key = salt or b""
+        return [blake2b(k.encode(), digest_size=16, key=key).hexdigest() for k in keys]
+
+    try:
+        import xxhash
+    except ImportError as e:
+        raise ImportError("xxhash keys require xxhash: pip install xxhash") from e
+    seed = int.from_bytes(hashlib.sha256(salt).digest()[:8], "little") if salt else 0
+    xxh3 = xxhash.xxh3_128_hexdigest
+    return [xxh3(k.encode(), seed=seed) for k in keys]
+
+
+def _hmac_hexdigest(keyed, key):
+    h = keyed.copy()
+    h.update(key.encode())
+    return h.hexdigest()
+
+
+def surrogate_keys(df, columns, algorithm="md5", salt=None):
+    """Return a Series of hashed keys over columns, aligned with df"""
+    keys = key_strings(df, columns)
+    return pd.Series(hash_keys(keys, algorithm, salt), index=df.index, dtype=object)
+
+
+def factorize_keys(df, columns):
+    """Code each row's composite key over columns
+
+    Returns ``(codes, first)``: an integer code per row, numbered in order of
+    first appearance, and the position of each code's first row, so
+    ``df.iloc[first]`` equals ``df.drop_duplicates(columns)``. Missing values
+    are ordinary key values that match each other, like in DataFrame.merge.
+    """
+    codes = np.zeros(len(df), dtype=np.int64)
+    for col in columns:
+        col_codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        # Renumber after each column so the combined codes stay below len(df)
+        codes, _ = pd.factorize(codes * len(uniques) + col_codes)
+    _, first = np.unique(codes, return_index=True)
+    return codes, first
@@ -0,0 +1,99 @@
+"""queries.sql run by DuckDB over small CSV and Parquet gold layers"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from analytics import AnalyticsEngine
+from storage import get_storage
+
+QUERIES = Path(__file__).resolve().parent.parent / "queries.sql"
+
+
+def gold():
+    patients = pd.DataFrame(
+        {
+            "patient_id": ["p1", "p2", "p3"],
+            "Patient Name": ["Ann Lee", "Bob Ray", "Cy Lum"],
+            "Patint DOB": pd.to_datetime(["1980-01-01", "1981-02-02", None]),
+            "Patient Gendr": ["Female", "Male", "Male"],
+        }
+    )
+    doctors = pd.DataFrame(
+        {
+            "doctor_id": [1, 2, 3],
+            "Doctor name": ["Dr. Kim", "Dr. Lee", "Dr. Ray"],
+            "Doctor specialty": ["ENT", "General", "ENT"],
+        }
+    )
+    appointments = pd.DataFrame(
+        {
+            "patient_id": ["p1", "p1", "p2", "p3", "p1"],
+            "doctor_id": [1, 2, 1, 3, 3],
+            "Appointment date time": pd.to_datetime(
+                [
+                    "2021-05-13 09:30",
+                    "2021-05-14 00:00",
+                    "2021-06-01 10:00",
+                    "2021-06-02 11:00",
+                    "2021-07-15 14:00",
+                ]
+            ),
+            "Appointment location": ["1 Ear St."] * 5,
+            "Reason for visit": ["Ache", "Flu", "Ache", "Check-up", "Ache"],
+            "Note": [None, "Call back", None, None, None],
+            "Follow up": [True, False, False, True, True],
+        }
+    )
+    return {"patients": patients, "doctors": doctors, "appointments": appointments}
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def engine(request, tmp_path):
+    pytest.importorskip("duckdb")
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    storage = get_storage(request.param, tmp_path)
+    for name, df in gold().items():
+        storage.write("gold", name, df)
+    with AnalyticsEngine(tmp_path) as engine:
+        yield engine
+
+
+def reports(engine):
+    """Each statement's result, by its last column name"""
+    return {df.columns[-1]: df for _, df in engine.run_script(QUERIES)}
+
+
+def test_every_query_runs(engine):
+    results = engine.run_script(QUERIES)
+
+    assert len(results) == 12
+    titles = [title for title, _ in results]
+    assert titles[0] == "1. Verify tables exist"
+    assert titles[-1] == "8. Monthly appointment distribution"
+    tables = results[0][1]
+    assert set(tables.iloc[:, 0]) == {"patients", "doctors", "appointments"}
+
+
+def test_reports_match_the_gold_tables(engine):
+    results = reports(engine)
+
+    assert results["total_patients"].iat[0, 0] == 3
+    assert results["total_doctors"].iat[0, 0] == 3
+    assert results["total_appointments"].iat[0, 0] == 5
+    assert results["doctor_count"].values.tolist() == [["ENT", 2], ["General", 1]]
+
+    follow_up = results["follow_up_percentage"].set_index("specialty")
+    assert follow_up["total_appointments"].to_dict() == {"ENT": 4, "General": 1}
+    assert follow_up["follow_ups"].to_dict() == {"ENT": 3, "General": 0}
+    assert follow_up["follow_up_percentage"].to_dict() == {
+        "ENT": 75.0,
+        "General": 0.0,
+    }
+
+    visits = results["visit_count"]
+    assert visits.values.tolist()[0] == ["Ann Lee", 3]
+    monthly = results["appointment_count"]
+    assert monthly.values.tolist() == [["2021-05", 2], ["2021-06", 2], ["2021-07", 1]]
@@ -0,0 +1,103 @@
+"""Bronze extraction and the repair of lines split by a stray comma"""
+
+import csv
+
+import pandas as pd
+import pytest
+
+from data_cleaner import HealthDataPipeline, _RepairedLineReader
+
+HEADER = (
+    "Patient Name,Patint DOB,Patient Gendr,Appointment date time,Doctor name,"
+    "Doctor specialty,Appointment location,Reason for visit,Note,Follow up"
+)
+COLUMNS = HEADER.split(",")
+# The malformed line of the sample file: the appointment date holds a comma
+SPLIT_APPOINTMENT = (
+    "Mike Miller,22-Jul-1985,Male,July 22, 2021 10:00 AM,Dr. Emily Wilson,"
+    "Neurology,456 Brain Ave., Dizziness,N/A,yes"
+)
+SPLIT_DOB = (
+    "Ann Lee,May 13, 1980,Female,2021-05-13 09:30,Dr. Ray,ENT,1 Ear St., Ache,N/A,Yes"
+)
+# Free text can't tell which of its columns the extra field belongs to
+SPLIT_REASON = (
+    "Bob Ray,1981-02-02,Male,2021-05-14,Dr. Ray,ENT,1 Ear St., Ache, cough,N/A,No"
+)
+SPLIT_NOTE = "Cy Lum,1982-03-03,Male,2021-05-15,Dr. Kim,General,2 Main St., Flu,Call, fasting,Yes"
+VALID = "Di Orr,1983-04-04,Female,2021-05-16,Dr. Kim,General,2 Main St., Flu,N/A,No"
+LINES = [SPLIT_APPOINTMENT, SPLIT_DOB, SPLIT_REASON, SPLIT_NOTE, VALID]
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "source.csv").write_text("\n".join([HEADER, *LINES]) + "\n")
+    return HealthDataPipeline()
+
+
+def fields(line):
+    return dict(zip(COLUMNS, next(csv.reader([line]))))
+
+
+def stored_bronze(tmp_path):
+    df = pd.read_csv(tmp_path / "processed_data" / "bronze" / "raw_health_data.csv")
+    return df.drop(columns="ingestion_date")
+
+
+@pytest.mark.parametrize(
+    "line, column, value",
+    [
+        (SPLIT_APPOINTMENT, "Appointment date time", "July 22  2021 10:00 AM"),
+        (SPLIT_DOB, "Patint DOB", "May 13  1980"),
+    ],
+    ids=["appointment", "dob"],
+)
+def test_repair_rejoins_a_split_date(pipeline, line, column, value):
+    repaired = fields(pipeline._repair_line(line, COLUMNS))
+
+    assert len(repaired) == len(COLUMNS)
+    assert repaired[column] == value
+    # The fields after the split one are back in their own columns
+    assert repaired["Doctor specialty"] in ("Neurology", "ENT")
+    assert repaired["Follow up"] in ("yes", "Yes")
+
+
+@pytest.mark.parametrize("line", [SPLIT_REASON, SPLIT_NOTE], ids=["reason", "note"])
+def test_split_free_text_is_not_guessed_at(pipeline, line):
+    assert pipeline._repair_line(line, COLUMNS) is None
+    assert pipeline._repair_line(VALID, COLUMNS) == VALID
+
+
+def test_reader_repairs_and_skips_lines_across_partial_reads(pipeline):
+    source = [line + "\n" for line in [HEADER, *LINES]]
+    reader = _RepairedLineReader(source, pipeline._repair_line)
+
+    chunks = []
+    while chunk := reader.read(7):
+        chunks.append(chunk)
+    text = "".join(chunks)
+
+    assert (reader.repaired, reader.skipped) == (2, 2)
+    assert text.splitlines() == [
+        HEADER,
+        pipeline._repair_line(SPLIT_APPOINTMENT, COLUMNS).rstrip("\n"),
+        pipeline._repair_line(SPLIT_DOB, COLUMNS).rstrip("\n"),
+        VALID,
+    ]
+
+
+def test_streaming_bronze_matches_in_memory(pipeline, tmp_path):
+    pipeline.extract_bronze("source.csv")
+    in_memory = stored_bronze(tmp_path)
+
+    assert pipeline.extract_bronze("source.csv", streaming=True, chunksize=2) == 3
+    streamed = stored_bronze(tmp_path)
+
+    pd.testing.assert_frame_equal(streamed, in_memory)
+    # The split dates are repaired and the split free text lines skipped, also
+    # in chunks after the first, where pandas would misalign their fields
+    assert streamed["Patient Name"].tolist() == ["Mike Miller", "Ann Lee", "Di Orr"]
+    assert streamed["Appointment date time"][0] == "July 22  2021 10:00 AM"
+    assert streamed["Patint DOB"][1] == "May 13  1980"
+    assert streamed["Reason for visit"].tolist() == [" Dizziness", " Ache", " Flu"]
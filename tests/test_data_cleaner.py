@@ -0,0 +1,194 @@
+"""Silver and gold stages of the pipeline"""
+
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from data_cleaner import HealthDataPipeline, run_pipeline
+from ingestion_state import IngestionState
+from storage import SILVER_SCHEMA
+
+HEADER = (
+    "Patient Name,Patint DOB,Patient Gendr,Appointment date time,Doctor name,"
+    "Doctor specialty,Appointment location,Reason for visit,Note,Follow up"
+)
+# Only one appointment has a time of day, so most chunks hold dates alone
+ROWS = [
+    "Ann Lee,1980-01-01,Female,2021-05-13 09:30,Dr. Ray,ENT,1 Ear St., Ache,N/A,Yes",
+    "Bob Ray,1981-02-02,Male,2021-05-14,Dr. Ray,ENT,1 Ear St., Ache,N/A,No",
+    "Cy Lum,1982-03-03,Male,2021-05-15,Dr. Kim,General,2 Main St., Check-up,N/A,Yes",
+    "Di Orr,1983-04-04,Female,2021-05-16,Dr. Kim,General,2 Main St., Flu,N/A,No",
+    "Ed Fox,1984-05-05,Male,2021-05-17,Dr. Ray,ENT,1 Ear St., Ache,N/A,Yes",
+    "Flo Nye,1985-06-06,Female,2021-05-18,Dr. Kim,General,2 Main St., Flu,N/A,No",
+]
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "healthcare_data.csv").write_text("\n".join([HEADER, *ROWS]) + "\n")
+    pipeline = HealthDataPipeline()
+    pipeline.extract_bronze("healthcare_data.csv")
+    return pipeline
+
+
+def stored_silver(pipeline):
+    df = pipeline.storage.read("silver", "cleaned_health_data")
+    for col in ["Patint DOB", "Appointment date time"]:
+        df[col] = pd.to_datetime(df[col], format="ISO8601")
+    columns = [col for col in SILVER_SCHEMA if col != "ingestion_date"]
+    return df[columns].sort_values("Patient Name", ignore_index=True)
+
+
+def test_out_of_core_silver_matches_in_memory(pipeline):
+    pipeline.transform_silver()
+    in_memory = stored_silver(pipeline)
+
+    pipeline.transform_silver(out_of_core=True, chunksize=2)
+    out_of_core = stored_silver(pipeline)
+
+    pd.testing.assert_frame_equal(out_of_core, in_memory)
+    # The chunks were written with and without a time; gold reads both
+    pipeline.load_gold()
+    assert pipeline.gold_appointments["Appointment date time"].tolist()[:2] == [
+        pd.Timestamp("2021-05-13 09:30"),
+        pd.Timestamp("2021-05-14"),
+    ]
+
+
+def test_incremental_null_key_rejects_are_not_duplicated(pipeline):
+    pipeline.transform_silver()
+    silver = pipeline.storage.read("silver", "cleaned_health_data")
+    silver.loc[1, "Doctor name"] = None
+
+    # The same batch is loaded twice, e.g. when a run is retried
+    for _ in range(2):
+        pipeline.load_gold(df=silver, incremental=True, reject_null_keys=True)
+
+    rejected = pipeline.storage.read("rejected", "null_key_records")
+    assert rejected["Patient Name"].tolist() == ["Bob Ray"]
+
+    # Once the key is filled in, the reprocessed row leaves the rejected layer
+    silver.loc[1, "Doctor name"] = "Dr. Ray"
+    pipeline.load_gold(df=silver, incremental=True, reject_null_keys=True)
+    assert pipeline.storage.read("rejected", "null_key_records").empty
+
+
+@pytest.mark.parametrize("incremental", [False, True], ids=["full", "incremental"])
+def test_run_without_mysql(tmp_path, monkeypatch, incremental):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "healthcare_data.csv").write_text("\n".join([HEADER, *ROWS]) + "\n")
+
+    run_pipeline("healthcare_data.csv", incremental=incremental, load_mysql=False)
+
+    gold = HealthDataPipeline().storage.read("gold", "patients")
+    assert len(gold) == len(ROWS)
+    if incremental:
+        # The run committed its state, so the next one finds nothing new
+        state = IngestionState(tmp_path / "processed_data" / "_state" / "ingestion.db")
+        try:
+            assert state.resume_offset("healthcare_data.csv") is None
+        finally:
+            state.close()
+
+
+def test_silver_resume_keeps_raw_value_rejects(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rows = [ROWS[0].replace("1980-01-01", "not a date"), *ROWS[1:]]
+    (tmp_path / "healthcare_data.csv").write_text("\n".join([HEADER, *rows]) + "\n")
+
+    run_pipeline("healthcare_data.csv", load_mysql=False)
+    storage = HealthDataPipeline().storage
+    rejected = storage.read("rejected", "rejected_records")
+    assert rejected["failed_rules"].tolist() == ["invalid_dob"]
+
+    # Restored silver can't be checked against the raw DOB again
+    run_pipeline("healthcare_data.csv", resume_from="silver", load_mysql=False)
+    pd.testing.assert_frame_equal(
+        storage.read("rejected", "rejected_records"), rejected
+    )
+
+
+class FailingConnection:
+    """Records statements and fails the first one starting with fail_on"""
+
+    def __init__(self, fail_on):
+        self.fail_on = fail_on
+        self.statements = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement):
+        self.statements.append(str(statement))
+        if str(statement).startswith(self.fail_on):
+            raise RuntimeError(f"{self.fail_on} failed")
+
+    def commit(self):
+        self.statements.append("COMMIT")
+
+
+def test_failed_swap_turns_foreign_key_checks_back_on(pipeline):
+    conn = FailingConnection("RENAME TABLE")
+    pipeline._engine = SimpleNamespace(connect=lambda: conn)
+
+    with pytest.raises(RuntimeError, match="RENAME TABLE failed"):
+        pipeline._swap_staging_tables()
+
+    assert "COMMIT" not in conn.statements
+    assert conn.statements[-1] == "SET FOREIGN_KEY_CHECKS = 1"
+
+
+def test_incremental_gold_rewrites_only_touched_months(pipeline, monkeypatch):
+    pipeline.transform_silver()
+    pipeline.load_gold()
+    may = pipeline.storage.partition_path("gold", "appointments", "year=2021/month=05")
+    may_version = may.stat().st_mtime_ns
+
+    batch = pipeline.gold_appointments.iloc[:1].copy()
+    batch["Appointment date time"] = pd.Timestamp("2021-06-01 10:00")
+    monkeypatch.setattr(
+        pipeline.storage,
+        "read",
+        lambda *args, **kwargs: pytest.fail("read the whole table"),
+    )
+    merged = pipeline._upsert_layer(
+        "gold", "appointments", batch, pipeline.APPOINTMENT_KEY
+    )
+
+    # Only June's rows come back, and May's file is left alone
+    assert merged["Appointment date time"].tolist() == [
+        pd.Timestamp("2021-06-01 10:00")
+    ]
+    assert may.stat().st_mtime_ns == may_version
+    assert pipeline.storage.partitions("gold", "appointments") == [
+        "year=2021/month=05",
+        "year=2021/month=06",
+    ]
+
+
+def test_gold_records_memory_of_its_compacted_tables(pipeline):
+    pipeline.transform_silver()
+    pipeline.load_gold()
+
+    steps = {step["step"]: step for step in pipeline.metrics.steps}
+    for table in ["patients", "doctors", "appointments"]:
+        step = steps[f"gold.optimize_{table}"]
+        assert step["memory_before_mb"] is not None
+        assert step["memory_after_mb"] is not None
+
+
+def test_parallel_silver_matches_serial(pipeline):
+    serial = pipeline.transform_silver()
+    serial_stats = pipeline.date_parse_stats
+
+    parallel = pipeline.transform_silver(parallel=True, workers=2, partition_size=2)
+
+    pd.testing.assert_frame_equal(parallel, serial)
+    # NaT counts add up across the partitions
+    for col, stats in serial_stats.items():
+        assert pipeline.date_parse_stats[col]["NaT"] == stats["NaT"]
@@ -0,0 +1,118 @@
+"""Column-wise and cached date parsing against the original row-wise parser"""
+
+import pandas as pd
+import pytest
+
+from data_cleaner import DateParseCache, HealthDataPipeline
+
+# pandas warns about the month-first strings the row-wise parser falls back on
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+# Date strings in the shapes the sample source file holds
+DATES = [
+    "1985/05/20",
+    "31-12-1990",
+    "11-02-1978",
+    "14 May 1982",
+    "07/18/1995",
+    "2000-01-01",
+    "13/01/1970",
+    "10.10.1982",
+    "03/05/1992",
+    "30-Nov-1989",
+    "1990.05.27",
+    "1995/10/30",
+    "07/15/2021 10:00 AM",
+    "15 Aug 2021 2:00 PM",
+    "20-08-2021 09:30",
+    "2021.07.22 11:00 AM",
+    "15th July 2021 10:00",
+    "08/25/2021 14:00",
+    "05 Oct 2021 3 PM",
+    "1st December 2021 1:00 PM",
+    "31.12.2021 14:00",
+    "2021/07/15 10:00 AM",
+    "28/02/2021 11:30 AM",
+    "24th August 2021 14:45",
+    "Unknown",
+    "not a date",
+    None,
+]
+
+
+@pytest.fixture
+def pipeline():
+    return HealthDataPipeline.__new__(HealthDataPipeline)
+
+
+def row_wise(series):
+    parsed = pd.to_datetime(series.apply(HealthDataPipeline._parse_date))
+    return parsed.astype("datetime64[ns]")
+
+
+def test_column_parser_matches_row_wise_parser(pipeline):
+    series = pd.Series(DATES * 3)
+
+    parsed, stats = pipeline._parse_dates(series)
+
+    pd.testing.assert_series_equal(parsed, row_wise(series))
+    # Year-first dates are read the way dayfirst=True read them
+    assert parsed[0] == pd.Timestamp("1985-05-20")
+    assert parsed[11] == pd.Timestamp("1995-10-30")
+    assert stats["NaT"] == 9
+    assert sum(stats[fmt] for fmt in pipeline.DATE_FORMATS) + stats["fallback"] == 72
+
+
+def test_column_parser_keeps_the_index(pipeline):
+    series = pd.Series(["2000-01-01", "Unknown", "31-12-1990"], index=[7, 3, 5])
+
+    parsed, _ = pipeline._parse_dates(series)
+
+    assert parsed.index.tolist() == [7, 3, 5]
+    assert parsed.isna().tolist() == [False, True, False]
+
+
+def test_cached_parser_matches_and_reuses_parsed_strings(pipeline):
+    pipeline.date_cache = DateParseCache()
+    series = pd.Series(DATES * 3)
+
+    first, first_stats = pipeline._parse_dates_cached(series)
+    second, second_stats = pipeline._parse_dates_cached(series)
+
+    expected, _ = pipeline._parse_dates(series)
+    pd.testing.assert_series_equal(first, expected)
+    pd.testing.assert_series_equal(second, expected)
+    # Each distinct string is parsed once; the second column is all hits
+    distinct = len(set(DATES) - {None})
+    rows = series.notna().sum()
+    assert first_stats["unique"] == second_stats["unique"] == distinct
+    assert (first_stats["hits"], first_stats["misses"]) == (0, rows)
+    assert (second_stats["hits"], second_stats["misses"]) == (rows, 0)
+    assert pipeline.date_cache.stats() == {
+        "size": distinct,
+        "hits": rows,
+        "misses": rows,
+        "hit_rate": 0.5,
+    }
+
+
+def test_cached_parser_counts_formats_in_rows(pipeline):
+    pipeline.date_cache = DateParseCache()
+    series = pd.Series(DATES * 3)
+    _, expected = pipeline._parse_dates(series)
+
+    # Per-format counts cover every row, whether or not its string was cached
+    for _ in range(2):
+        _, stats = pipeline._parse_dates_cached(series)
+        for key in [*pipeline.DATE_FORMATS, "fallback", "NaT"]:
+            assert stats[key] == expected[key], key
+
+
+def test_cache_evicts_the_least_recently_used():
+    cache = DateParseCache(maxsize=2)
+    cache.put_many(["a", "b"], [1, 2])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [3])
+
+    assert cache.get_many(["a", "b", "c"]) == [1, None, 3]
+    assert len(cache) == 2
@@ -0,0 +1,54 @@
+"""Persistent doctor dimension IDs"""
+
+import pandas as pd
+import pytest
+
+from dimension_store import DimensionStore
+
+KEY = ["Doctor name", "Doctor specialty"]
+
+
+def doctors(*rows):
+    return pd.DataFrame(list(rows), columns=KEY)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "dimensions" / "doctors.csv"
+
+
+def store(path):
+    return DimensionStore(path, KEY, "doctor_id")
+
+
+def test_ids_survive_a_reload_in_any_row_order(path):
+    first = store(path).assign(
+        doctors(("Dr. Ray", "ENT"), ("Dr. Kim", "General"), ("Dr. Ray", "ENT"))
+    )
+    assert first.tolist() == [1, 2, 1]
+
+    reloaded = store(path)
+    ids = reloaded.assign(doctors(("Dr. Lee", "ENT"), ("Dr. Kim", "General")))
+    assert ids.tolist() == [3, 2]
+    assert len(reloaded) == 3
+    found = store(path).lookup(doctors(("Dr. Lee", "ENT"), ("Dr. No", "ENT")))
+    assert found[0] == 3 and pd.isna(found[1])
+
+
+def test_missing_and_na_like_values_round_trip(path):
+    df = doctors(("NA", "ENT"), (None, "ENT"), ("Dr. Ray", None))
+    ids = store(path).assign(df)
+
+    # "NA" is a name, not a missing value, and missing values are keys too
+    assert ids.tolist() == [1, 2, 3]
+    assert store(path).assign(df).tolist() == [1, 2, 3]
+
+
+def test_seed_keeps_existing_ids(path):
+    dimension = store(path)
+    dimension.seed(doctors(("Dr. Ray", "ENT")).assign(doctor_id=[7]))
+
+    assert dimension.assign(
+        doctors(("Dr. Kim", "General"), ("Dr. Ray", "ENT"))
+    ).tolist() == [8, 7]
+    assert store(path).lookup(doctors(("Dr. Ray", "ENT"))).tolist() == [7]
@@ -0,0 +1,94 @@
+"""Incremental bronze ingestion from the stored watermark and row hashes"""
+
+import pytest
+
+from data_cleaner import HealthDataPipeline, run_pipeline
+from ingestion_state import IngestionState
+from test_data_cleaner import HEADER, ROWS
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return HealthDataPipeline()
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = IngestionState(tmp_path / "state.db")
+    yield state
+    state.close()
+
+
+def write_source(path, rows, newline="\n", bom=False):
+    text = newline.join([HEADER, *rows]) + newline
+    path.write_bytes((b"\xef\xbb\xbf" if bom else b"") + text.encode())
+
+
+def ingest(pipeline, state, path):
+    delta = pipeline.extract_bronze_incremental(str(path), state)
+    state.commit()
+    return [] if delta.empty else delta["Patient Name"].tolist()
+
+
+def test_appended_rows_resume_from_the_watermark(pipeline, state, tmp_path):
+    source = tmp_path / "source.csv"
+    write_source(source, ROWS[:3])
+    assert ingest(pipeline, state, source) == ["Ann Lee", "Bob Ray", "Cy Lum"]
+    assert ingest(pipeline, state, source) == []
+
+    write_source(source, ROWS)
+    offset = state.resume_offset(str(source))
+    assert offset == len("\n".join([HEADER, *ROWS[:3]]) + "\n")
+    assert ingest(pipeline, state, source) == ["Di Orr", "Ed Fox", "Flo Nye"]
+
+
+def test_rewritten_file_yields_only_changed_rows(pipeline, state, tmp_path):
+    source = tmp_path / "source.csv"
+    write_source(source, ROWS)
+    ingest(pipeline, state, source)
+
+    # The fingerprint no longer matches, so the file is rescanned and the
+    # row hashes pick out the one row whose content changed
+    write_source(source, [ROWS[0].replace("N/A", "Rebooked"), *ROWS[1:]])
+    assert state.resume_offset(str(source)) == 0
+    assert ingest(pipeline, state, source) == ["Ann Lee"]
+
+
+def test_crlf_file_with_bom_reads_from_the_header_bytes(pipeline, state, tmp_path):
+    source = tmp_path / "source.csv"
+    write_source(source, ROWS[:3], newline="\r\n", bom=True)
+    header_bytes = 3 + len(HEADER) + 2
+
+    delta = pipeline.extract_bronze_incremental(str(source), state)
+    state.commit()
+
+    assert delta["Patient Name"].tolist() == ["Ann Lee", "Bob Ray", "Cy Lum"]
+    bronze = pipeline.metrics.steps[-1]
+    assert bronze["bytes_read"] == source.stat().st_size - header_bytes
+
+    write_source(source, ROWS, newline="\r\n", bom=True)
+    assert ingest(pipeline, state, source) == ["Di Orr", "Ed Fox", "Flo Nye"]
+
+
+def test_swap_needs_a_full_load(pipeline, tmp_path):
+    write_source(tmp_path / "source.csv", ROWS)
+    with pytest.raises(ValueError, match="swap"):
+        run_pipeline("source.csv", incremental=True, swap=True, load_mysql=False)
+
+
+def test_incremental_run_after_a_full_run_rebuilds_bronze(pipeline, tmp_path):
+    source = tmp_path / "source.csv"
+    write_source(source, ROWS[:3])
+    run_pipeline("source.csv", load_mysql=False)
+    run_pipeline("source.csv", incremental=True, load_mysql=False)
+
+    # The full run left no watermark, so the rescan replaces bronze
+    bronze = pipeline.storage.read("bronze", "raw_health_data")
+    assert bronze["Patient Name"].tolist() == ["Ann Lee", "Bob Ray", "Cy Lum"]
+
+    write_source(source, ROWS)
+    run_pipeline("source.csv", incremental=True, load_mysql=False)
+    bronze = pipeline.storage.read("bronze", "raw_health_data")
+    assert len(bronze) == len(ROWS)
+    assert len(pipeline.storage.read("silver", "cleaned_health_data")) == len(ROWS)
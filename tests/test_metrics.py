@@ -0,0 +1,97 @@
+"""Run metrics steps, metered storage and the Prometheus textfile"""
+
+import pandas as pd
+import pytest
+
+import metrics
+from metrics import MeteredStorage, RunMetrics
+from storage import CsvStorage
+
+
+@pytest.fixture
+def run():
+    return RunMetrics()
+
+
+def step_records(run):
+    return {record["step"]: record for record in run.steps}
+
+
+def test_nested_steps_are_named_after_their_parents(run):
+    with run.step("silver", rows_in=3) as silver:
+        with run.step("parse_dates"):
+            with run.step("cache"):
+                pass
+        silver["rows_out"] = 2
+    with run.step("gold"):
+        pass
+
+    assert [record["step"] for record in run.steps] == [
+        "silver",
+        "silver.parse_dates",
+        "silver.parse_dates.cache",
+        "gold",
+    ]
+    assert (silver["rows_in"], silver["rows_out"]) == (3, 2)
+
+
+def test_metered_bytes_add_up_through_the_parent_steps(run, tmp_path):
+    storage = MeteredStorage(CsvStorage(tmp_path), run)
+    df = pd.DataFrame({"a": range(100)})
+
+    with run.step("gold"):
+        with run.step("write"):
+            storage.write("gold", "patients", df)
+        with run.step("read"):
+            storage.read("gold", "patients")
+    # Outside any step the I/O is not recorded
+    storage.read("gold", "patients")
+
+    size = (tmp_path / "gold" / "patients.csv").stat().st_size
+    steps = step_records(run)
+    assert steps["gold.write"]["bytes_written"] == size
+    assert steps["gold.read"]["bytes_read"] == size
+    assert (steps["gold"]["bytes_read"], steps["gold"]["bytes_written"]) == (size, size)
+
+
+def test_prometheus_textfile_totals_repeated_steps(run, tmp_path):
+    for rows in (2, 3):
+        with run.step("chunk", rows_in=rows) as step:
+            step["rule_failures"] = {"missing_name": 1, "invalid_dob": rows}
+    path = run.write_prometheus(tmp_path / "metrics.prom", prefix="etl")
+
+    lines = path.read_text().splitlines()
+    assert "# HELP etl_step_rows_in Rows going into the pipeline step" in lines
+    assert "# TYPE etl_step_rows_in gauge" in lines
+    # One series per step, summed over its runs
+    assert lines.count('etl_step_rows_in{step="chunk"} 5') == 1
+    assert not any(line.startswith("etl_step_rows_out{") for line in lines)
+    assert "# TYPE etl_rule_failures gauge" in lines
+    assert 'etl_rule_failures{step="chunk",rule="missing_name"} 2' in lines
+    assert 'etl_rule_failures{step="chunk",rule="invalid_dob"} 5' in lines
+    assert lines[-1] == f"etl_last_run_timestamp_seconds {run.started.timestamp()}"
+
+
+def test_prometheus_textfile_is_replaced_atomically(run, tmp_path, monkeypatch):
+    path = tmp_path / "metrics.prom"
+    path.write_text("previous\n")
+    renames = []
+
+    def failing_replace(src, dst):
+        renames.append((src, dst))
+        raise OSError("rename failed")
+
+    monkeypatch.setattr(metrics.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        run.write_prometheus(path)
+
+    # The new file is written beside the old one, which stays whole until the rename
+    tmp = tmp_path / "metrics.prom.tmp"
+    assert renames == [(tmp, path)]
+    assert path.read_text() == "previous\n"
+    assert tmp.read_text().startswith("# HELP")
+
+    monkeypatch.undo()
+    run.write_prometheus(path)
+    assert path.read_text().startswith("# HELP")
+    assert not tmp.exists()
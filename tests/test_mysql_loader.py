@@ -0,0 +1,166 @@
+"""BulkLoader's INSERT and upsert paths against SQLite, and its threaded writers"""
+
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from mysql_loader import BulkLoader, to_records
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE appointments (patient_id TEXT, appointment_datetime "
+                "TIMESTAMP, notes TEXT, follow_up BOOLEAN, "
+                "PRIMARY KEY (patient_id, appointment_datetime))"
+            )
+        )
+    return engine
+
+
+def frame(notes="first", rows=5):
+    return pd.DataFrame(
+        {
+            "patient_id": [f"p{i}" for i in range(rows)],
+            "appointment_datetime": pd.date_range("2021-01-01 09:00", periods=rows),
+            "notes": [notes] * (rows - 1) + [None],
+            "follow_up": pd.array([True, False] * (rows // 2) + [None] * (rows % 2)),
+        }
+    )
+
+
+def stored(engine):
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT * FROM appointments ORDER BY patient_id")
+        ).fetchall()
+
+
+def test_insert_in_several_batches(engine):
+    loader = BulkLoader(engine, batch_size=2)
+    report = loader.load("appointments", frame())
+
+    assert report["rows"] == 5
+    assert report["method"] == "executemany"
+    rows = stored(engine)
+    assert [row.patient_id for row in rows] == ["p0", "p1", "p2", "p3", "p4"]
+    assert rows[0].appointment_datetime == "2021-01-01 09:00:00"
+    assert rows[4].notes is None and rows[4].follow_up is None
+
+
+def test_upsert_replaces_rows_with_the_same_key(engine):
+    loader = BulkLoader(engine, batch_size=2)
+    loader.load("appointments", frame(rows=3))
+    loader.load(
+        "appointments",
+        frame(notes="second", rows=5),
+        upsert=True,
+        key=["patient_id", "appointment_datetime"],
+    )
+
+    rows = stored(engine)
+    assert len(rows) == 5
+    assert [row.notes for row in rows] == ["second"] * 4 + [None]
+
+
+def test_upsert_needs_a_key_outside_mysql(engine):
+    with pytest.raises(ValueError, match="key columns"):
+        BulkLoader(engine).load("appointments", frame(), upsert=True)
+
+
+def test_to_records_converts_to_native_values():
+    records = to_records(frame(rows=3))
+
+    assert records[0]["appointment_datetime"] == datetime(2021, 1, 1, 9)
+    assert type(records[0]["appointment_datetime"]) is datetime
+    assert records[2]["notes"] is None
+    assert records[2]["follow_up"] is None
+
+
+def test_upsert_skips_rows_without_a_key_value(engine):
+    loader = BulkLoader(engine, batch_size=2)
+    df = frame(rows=3)
+    df.loc[2, "appointment_datetime"] = pd.NaT
+
+    # NULLs never conflict, so a reloaded row would be inserted again
+    for _ in range(2):
+        report = loader.load(
+            "appointments", df, upsert=True, key=["patient_id", "appointment_datetime"]
+        )
+
+    assert report["rows"] == 2 and report["skipped"] == 1
+    assert [row.patient_id for row in stored(engine)] == ["p0", "p1"]
+
+
+class RecordingLoader(BulkLoader):
+    """Records the batches its writer threads commit instead of writing them"""
+
+    def __init__(self, connections, fail_on=None, delay=0.0, **kwargs):
+        # A dialect other than SQLite keeps the connections asked for
+        engine = SimpleNamespace(dialect=SimpleNamespace(name="stub"))
+        super().__init__(engine, connections=connections, **kwargs)
+        self.fail_on = fail_on
+        self.delay = delay
+        self.committed = []
+        self.threads = set()
+        self.serialized = 0
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self._lock = threading.Lock()
+
+    def _serialize(self, table, batch):
+        with self._lock:
+            self.serialized += 1
+            self.outstanding += 1
+            self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        return super()._serialize(table, batch)
+
+    def _write_once(self, table, item, upsert, key):
+        time.sleep(self.delay)
+        ids = item["batch"]["patient_id"].tolist()
+        with self._lock:
+            self.outstanding -= 1
+            self.threads.add(threading.current_thread().name)
+        if self.fail_on in ids:
+            raise RuntimeError(f"failed on {self.fail_on}")
+        with self._lock:
+            self.committed.extend(ids)
+
+
+def test_overlapped_load_commits_every_batch_once():
+    loader = RecordingLoader(connections=3, delay=0.01, batch_size=2)
+    report = loader.load("appointments", frame(rows=11))
+
+    assert report["rows"] == 11 and report["connections"] == 3
+    assert sorted(loader.committed) == sorted(f"p{i}" for i in range(11))
+    assert len(loader.threads) > 1
+
+
+def test_overlapped_load_bounds_the_batches_in_flight():
+    loader = RecordingLoader(connections=2, delay=0.01, batch_size=1, queue_size=2)
+    loader.load("appointments", frame(rows=20))
+
+    # The producer blocks on the full queue instead of running ahead: at
+    # most one batch per writer, a full queue and the one being serialized
+    assert loader.max_outstanding <= loader.queue_size + loader.connections + 1
+    assert len(loader.committed) == 20
+
+
+def test_overlapped_load_stops_when_a_writer_fails():
+    loader = RecordingLoader(connections=2, fail_on="p5", batch_size=1, queue_size=2)
+
+    with pytest.raises(RuntimeError, match="failed on p5"):
+        loader.load("appointments", frame(rows=200))
+
+    # The producer stops soon after the failure and the writers drain the rest
+    assert "p5" not in loader.committed
+    assert loader.serialized < 200
+    assert loader.reports == []
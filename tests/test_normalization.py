@@ -0,0 +1,81 @@
+"""Rule-driven text normalization of the silver text columns"""
+
+import numpy as np
+import pandas as pd
+
+from data_cleaner import HealthDataPipeline
+from normalization import TextRule, normalize_column, normalize_text, null_token_mask
+
+GENDER = HealthDataPipeline.TEXT_RULES["Patient Gendr"]
+FOLLOW_UP = HealthDataPipeline.TEXT_RULES["Follow up"]
+
+
+def values(column):
+    return [None if pd.isna(v) else v for v in column.tolist()]
+
+
+def test_strips_and_nulls_tokens_in_any_case_or_padding():
+    column = pd.Series(["  Ann ", "NULL", " n/a ", "unknown", "", "   ", None, np.nan])
+
+    assert values(normalize_column(column, TextRule())) == ["Ann"] + [None] * 7
+
+
+def test_mapping_casefolds_and_nulls_unmapped_values():
+    column = pd.Series([" M", "female", "FEMALE ", "x", "Male", None])
+
+    assert values(normalize_column(column, GENDER)) == [
+        "Male",
+        "Female",
+        "Female",
+        None,
+        "Male",
+        None,
+    ]
+
+
+def test_non_text_values_are_normalized_by_their_text():
+    # pandas reads an all yes/no column as text but true/false as booleans
+    column = pd.Series([True, False, "Yes", " no ", "N/A"], dtype=object)
+
+    assert values(normalize_column(column, FOLLOW_UP)) == [
+        True,
+        False,
+        True,
+        False,
+        None,
+    ]
+    assert values(normalize_column(pd.Series([1, 2, 1]), TextRule())) == [
+        "1",
+        "2",
+        "1",
+    ]
+
+
+def test_strip_false_still_recognizes_padded_null_tokens():
+    column = pd.Series([" keep ", " NULL "])
+
+    assert values(normalize_column(column, TextRule(strip=False))) == [" keep ", None]
+
+
+def test_normalize_text_handles_empty_and_categorical_columns():
+    df = pd.DataFrame(
+        {
+            "Note": pd.Series([" a ", "N/A", " a "], dtype="category"),
+            "Doctor name": [None, None, None],
+            "Untouched": [" x ", " y ", " z "],
+        }
+    )
+    rules = {"Note": TextRule(), "Doctor name": TextRule()}
+
+    out = normalize_text(df, rules)
+
+    assert values(out["Note"]) == ["a", None, "a"]
+    assert out["Doctor name"].isna().all()
+    assert out["Untouched"].tolist() == [" x ", " y ", " z "]
+    assert normalize_text(df.iloc[:0].copy(), rules).empty
+
+
+def test_null_token_mask_leaves_missing_values_out():
+    column = pd.Series(["Unknown", " null", "Ann", None])
+
+    assert null_token_mask(column).tolist() == [True, True, False, False]
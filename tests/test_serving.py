@@ -0,0 +1,149 @@
+"""Serving tables and DoctorDateIndex filters against groupbys and scans of gold"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from serving import DoctorDateIndex, build_serving_tables
+
+
+@pytest.fixture
+def counts():
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp("2021-01-01") + pd.to_timedelta(
+        rng.integers(0, 90, 300), unit="D"
+    )
+    df = pd.DataFrame(
+        {
+            "appointment_date": dates,
+            "doctor_name": rng.choice(["Dr. Kim", "Dr. Lee", "Dr. Ray"], 300),
+            "appointments": rng.integers(1, 5, 300),
+        }
+    )
+    df.loc[::25, "appointment_date"] = pd.NaT
+    df.loc[::40, "doctor_name"] = None
+    return df
+
+
+def scan(df, doctor=None, start=None, end=None):
+    keep = pd.Series(True, index=df.index)
+    if doctor is not None:
+        keep &= df["doctor_name"] == doctor
+    if start is not None:
+        keep &= df["appointment_date"] >= start
+    if end is not None:
+        keep &= df["appointment_date"] < end
+    return df[keep]
+
+
+def same_rows(selected, expected):
+    key = ["appointment_date", "doctor_name", "appointments"]
+    pd.testing.assert_frame_equal(
+        selected[key].sort_values(key, ignore_index=True),
+        expected[key].sort_values(key, ignore_index=True),
+    )
+
+
+@pytest.mark.parametrize("doctor", [None, "Dr. Kim", "Dr. Ray", "Dr. Nobody"])
+@pytest.mark.parametrize(
+    "start,end",
+    [
+        ("2021-02-01", "2021-03-01"),
+        ("2021-01-01", "2021-01-02"),
+        ("2022-01-01", "2022-02-01"),
+    ],
+)
+def test_select_matches_a_full_scan(counts, doctor, start, end):
+    index = DoctorDateIndex(counts, "appointment_date")
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+
+    same_rows(index.select(doctor, start, end), scan(counts, doctor, start, end))
+
+
+def test_unbounded_select_leaves_out_rows_without_a_date(counts):
+    index = DoctorDateIndex(counts, "appointment_date")
+    dated = counts[counts["appointment_date"].notna()]
+
+    same_rows(index.select(), dated)
+    same_rows(index.select("Dr. Lee"), scan(dated, "Dr. Lee"))
+
+
+def test_date_range_ignores_missing_dates(counts):
+    index = DoctorDateIndex(counts, "appointment_date")
+
+    dates = counts["appointment_date"]
+    assert index.date_range == (dates.min(), dates.max())
+    assert DoctorDateIndex(counts.iloc[:0], "appointment_date").date_range == (
+        None,
+        None,
+    )
+
+
+@pytest.fixture
+def gold():
+    rng = np.random.default_rng(1)
+    patients = pd.DataFrame(
+        {
+            "patient_id": range(6),
+            "Patint DOB": pd.to_datetime(
+                ["1980-05-01", "1980-12-31", "1991-02-02", None, "2001-07-07", None]
+            ),
+            "Patient Gendr": ["Female", "Male", "Female", None, "Male", "Female"],
+        }
+    )
+    doctors = pd.DataFrame(
+        {
+            "doctor_id": range(4),
+            "Doctor name": ["Dr. Kim", "Dr. Lee", "Dr. Ray", "Dr. Orr"],
+            "Doctor specialty": ["ENT", "General", "ENT", None],
+        }
+    )
+    when = pd.Timestamp("2021-03-01 08:00") + pd.to_timedelta(
+        rng.integers(0, 30 * 24, 200), unit="h"
+    )
+    appointments = pd.DataFrame(
+        {
+            "patient_id": rng.integers(0, 6, 200),
+            "doctor_id": rng.integers(0, 4, 200),
+            "Appointment date time": when,
+        }
+    )
+    appointments.loc[::30, "Appointment date time"] = pd.NaT
+    return patients, doctors, appointments
+
+
+def totals(table, key, value):
+    return table.set_index(key)[value].sort_index().to_dict()
+
+
+def test_serving_tables_match_groupbys_over_gold(gold):
+    patients, doctors, appointments = gold
+    today = datetime.date(2024, 6, 1)
+
+    tables = build_serving_tables(patients, doctors, appointments, today=today)
+
+    when = appointments["Appointment date time"]
+    expected = (
+        appointments.assign(appointment_date=when.dt.normalize(), hour=when.dt.hour)
+        .merge(doctors, on="doctor_id")
+        .groupby(["appointment_date", "hour", "Doctor name"])
+        .size()
+    )
+    key = ["appointment_date", "hour", "doctor_name"]
+    counts = totals(tables["appointment_counts"], key, "appointments")
+    assert counts == expected.sort_index().to_dict()
+    # Appointments without a date have no day or hour to count under
+    assert sum(counts.values()) == when.notna().sum()
+
+    ages = (today.year - patients["Patint DOB"].dt.year).dropna().astype(int)
+    assert totals(tables["patient_ages"], "age", "patients") == (
+        ages.groupby(ages).size().to_dict()
+    )
+    assert totals(tables["gender_counts"], "patient_gendr", "patients") == (
+        patients.groupby("Patient Gendr").size().to_dict()
+    )
+    assert totals(tables["specialty_counts"], "doctor_specialty", "doctors") == (
+        doctors.groupby("Doctor specialty").size().to_dict()
+    )
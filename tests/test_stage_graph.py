@@ -0,0 +1,77 @@
+"""Stage ordering, halting and resuming in StageGraph"""
+
+import pytest
+
+from stage_graph import HALT, StageGraph
+
+
+def graph(calls, halt_silver=False):
+    graph = StageGraph()
+
+    def stage(name, result):
+        def run(*inputs):
+            calls.append((name, inputs))
+            return result
+
+        return run
+
+    graph.add("bronze", stage("bronze", "raw"), restore=lambda: "stored raw")
+    graph.add(
+        "silver",
+        stage("silver", HALT if halt_silver else "clean"),
+        after=["bronze"],
+        restore=lambda: "stored clean",
+    )
+    graph.add("gold", stage("gold", "tables"), after=["silver"])
+    graph.add("serving", stage("serving", "charts"), after=["gold"])
+    return graph
+
+
+def test_results_flow_between_stages():
+    calls = []
+    results = graph(calls).run()
+
+    assert results == {
+        "bronze": "raw",
+        "silver": "clean",
+        "gold": "tables",
+        "serving": "charts",
+    }
+    assert ("gold", ("clean",)) in calls
+
+
+def test_halt_stops_downstream_stages_and_a_resume_picks_up():
+    calls = []
+    results = graph(calls, halt_silver=True).run()
+
+    assert results["gold"] is HALT and results["serving"] is HALT
+    assert [name for name, _ in calls] == ["bronze", "silver"]
+
+    calls.clear()
+    results = graph(calls).run(resume_from="bronze")
+
+    # Stages after the persisted bronze layer rerun from its stored output
+    assert results["bronze"] == "stored raw"
+    assert calls == [
+        ("silver", ("stored raw",)),
+        ("gold", ("clean",)),
+        ("serving", ("tables",)),
+    ]
+
+
+def test_resume_needs_a_restore_for_skipped_inputs():
+    with pytest.raises(ValueError, match="can't be resumed"):
+        graph([]).run(resume_from="gold")
+
+
+def test_failed_stage_starts_nothing_downstream():
+    calls = []
+    failing = graph(calls)
+
+    def fail(bronze):
+        raise RuntimeError("silver failed")
+
+    failing.stages["silver"]["func"] = fail
+    with pytest.raises(RuntimeError, match="silver failed"):
+        failing.run()
+    assert [name for name, _ in calls] == ["bronze"]
@@ -0,0 +1,104 @@
+"""Layer storage backends and month-partitioned tables"""
+
+import pandas as pd
+import pytest
+
+from storage import CsvStorage, ParquetStorage
+
+
+@pytest.fixture
+def parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    return ParquetStorage(tmp_path)
+
+
+def test_parquet_writes_inferred_values_of_string_columns_as_text(parquet):
+    # A chunk whose follow-ups are all true/false is read as bools
+    df = pd.DataFrame(
+        {
+            "Patient Name": ["Ann", "Bob", "Cy"],
+            "Follow up": [True, False, None],
+            "Note": [1, 2, 3],
+        }
+    )
+    parquet.write("bronze", "raw_health_data", df)
+
+    stored = parquet.read("bronze", "raw_health_data")
+    assert stored["Follow up"].tolist()[:2] == ["True", "False"]
+    assert pd.isna(stored["Follow up"].iloc[2])
+    assert stored["Note"].tolist() == ["1", "2", "3"]
+
+
+def appointments(dates):
+    return pd.DataFrame(
+        {
+            "patient_id": [f"p{i}" for i in range(len(dates))],
+            "Appointment date time": pd.to_datetime(dates),
+        }
+    )
+
+
+def test_read_range_opens_only_overlapping_partitions(tmp_path, monkeypatch):
+    storage = CsvStorage(tmp_path)
+    storage.write(
+        "gold",
+        "appointments",
+        appointments(["2021-04-30", "2021-05-01", "2021-05-31", "2021-06-01", None]),
+    )
+    assert storage.partitions("gold", "appointments") == [
+        "year=2021/month=04",
+        "year=2021/month=05",
+        "year=2021/month=06",
+        "year=__HIVE_DEFAULT_PARTITION__/month=__HIVE_DEFAULT_PARTITION__",
+    ]
+
+    opened = []
+    read_file = storage._read_file
+    monkeypatch.setattr(
+        storage,
+        "_read_file",
+        lambda path, columns=None: opened.append(path) or read_file(path, columns),
+    )
+    df = storage.read_range("gold", "appointments", "2021-05-01", "2021-06-01")
+
+    assert df["patient_id"].tolist() == ["p1", "p2"]
+    assert opened == [
+        storage.partition_path("gold", "appointments", "year=2021/month=05")
+    ]
+
+
+def test_full_write_drops_months_no_longer_present(tmp_path):
+    storage = CsvStorage(tmp_path)
+    storage.write("gold", "appointments", appointments(["2021-04-30", "2021-05-01"]))
+    storage.write("gold", "appointments", appointments(["2021-05-02"]))
+
+    assert storage.partitions("gold", "appointments") == ["year=2021/month=05"]
+    assert storage.read("gold", "appointments")["patient_id"].tolist() == ["p0"]
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path, monkeypatch):
+    storage = CsvStorage(tmp_path)
+    storage.write("gold", "patients", pd.DataFrame({"patient_id": ["p0"]}))
+
+    def crash(path, df, layer, name):
+        path.write_text("patient_id\n")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage, "_write_file", crash)
+    with pytest.raises(OSError):
+        storage.write("gold", "patients", pd.DataFrame({"patient_id": ["p1"]}))
+
+    assert storage.read("gold", "patients")["patient_id"].tolist() == ["p0"]
+    assert list((tmp_path / "gold").iterdir()) == [storage.path("gold", "patients")]
+
+
+def test_failed_chunked_write_keeps_the_previous_file(tmp_path):
+    storage = CsvStorage(tmp_path)
+    storage.write("bronze", "raw_health_data", pd.DataFrame({"a": [1]}))
+
+    with pytest.raises(RuntimeError):
+        with storage.open_writer("bronze", "raw_health_data") as writer:
+            writer.write(pd.DataFrame({"a": [2]}))
+            raise RuntimeError("source file went away")
+
+    assert storage.read("bronze", "raw_health_data")["a"].tolist() == [1]
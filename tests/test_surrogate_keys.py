@@ -0,0 +1,63 @@
+"""Factorized composite keys against the merges they replaced"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from surrogate_keys import factorize_keys, surrogate_keys
+
+KEY = ["Patient Name", "Patint DOB"]
+
+
+def patients():
+    return pd.DataFrame(
+        {
+            "Patient Name": ["Ann", None, "Ann", None, "Bob", "Bob", np.nan],
+            "Patint DOB": pd.to_datetime(
+                [
+                    "1980-01-01",
+                    "1981-02-02",
+                    "1980-01-01",
+                    "1981-02-02",
+                    None,
+                    None,
+                    "1981-02-02",
+                ]
+            ),
+            "row": range(7),
+        }
+    )
+
+
+def merged_ids(df):
+    """Assign IDs with drop_duplicates and merge, as load_gold used to"""
+    dimension = df[KEY].drop_duplicates()
+    dimension["id"] = range(len(dimension))
+    merged = df.merge(dimension, on=KEY)
+    return dimension, merged.sort_values("row")["id"].tolist()
+
+
+@pytest.mark.parametrize("categorical", [False, True], ids=["object", "category"])
+def test_factorized_null_keys_match_merge(categorical):
+    df = patients()
+    if categorical:
+        df["Patient Name"] = df["Patient Name"].astype("category")
+
+    codes, first = factorize_keys(df, KEY)
+    dimension, ids = merged_ids(df)
+
+    # Missing values match each other, so no row is dropped or duplicated
+    assert len(ids) == len(df)
+    assert codes.tolist() == ids
+    pd.testing.assert_frame_equal(df.iloc[first][KEY], dimension[KEY])
+
+
+def test_surrogate_keys_match_row_wise_md5():
+    df = patients()
+    expected = [
+        hashlib.md5(f"{name}_{dob}".encode()).hexdigest()
+        for name, dob in zip(df["Patient Name"], df["Patint DOB"])
+    ]
+    assert surrogate_keys(df, KEY).tolist() == expected
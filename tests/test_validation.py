@@ -0,0 +1,47 @@
+"""Data quality rules over cleaned frames and their raw source values"""
+
+import pandas as pd
+
+from validation import DEFAULT_RULES, validate
+
+
+def frames(raw_dob, clean_dob, raw_appointment="05 May 2021 09:00 AM"):
+    raw = pd.DataFrame(
+        {
+            "Patint DOB": [raw_dob],
+            "Appointment date time": [raw_appointment],
+            "Patient Gendr": ["Male"],
+            "Follow up": ["Yes"],
+        }
+    )
+    clean = pd.DataFrame(
+        {
+            "Patient Name": ["Liam"],
+            "Patint DOB": [pd.Timestamp(clean_dob) if clean_dob else pd.NaT],
+            "Appointment date time": [pd.Timestamp("2021-05-05 09:00")],
+            "Patient Gendr": ["Male"],
+            "Follow up": [True],
+        }
+    )
+    return clean, raw
+
+
+def test_unknown_date_is_missing_not_invalid():
+    clean, raw = frames("Unknown", None)
+    clean["Appointment date time"] = pd.NaT
+    raw["Appointment date time"] = " unknown "
+
+    failed, counts = validate(clean, raw, DEFAULT_RULES)
+
+    assert failed.empty
+    assert counts["invalid_dob"] == 0
+    assert counts["invalid_appointment_date"] == 0
+
+
+def test_unparseable_date_is_invalid():
+    clean, raw = frames("31 Feb 1985", None)
+
+    failed, counts = validate(clean, raw, DEFAULT_RULES)
+
+    assert failed.tolist() == ["invalid_dob"]
+    assert counts["invalid_dob"] == 1
@@ -0,0 +1,107 @@
+"""Declarative data quality rules for the silver layer
+
+Each Rule names a check that returns a boolean mask of the failing rows.
+Checks are vectorized over whole columns, so validate() evaluates every
+rule in one pass over the frame. Rules that compare the cleaned values with
+the raw source values (to tell an unparseable date from a missing one) need
+the bronze columns and are skipped when those aren't available, e.g. when
+validating a stored silver layer. They all count the NULL_TOKENS that
+cleaning nulls as missing values, not as invalid ones.
+"""
+
+import numpy as np
+import pandas as pd
+
+from normalization import NULL_TOKENS, null_token_mask
+
+
+class Rule:
+    """A data quality rule; ``check(clean, raw)`` is True for failing rows"""
+
+    def __init__(self, rule_id, description, check, needs_raw=False):
+        self.rule_id = rule_id
+        self.description = description
+        self.check = check
+        self.needs_raw = needs_raw
+
+    def __repr__(self):
+        return f"Rule({self.rule_id!r})"
+
+
+def coerced_to_null(col, null_tokens=()):
+    """Check for raw values that cleaning turned into nulls"""
+
+    def check(clean, raw):
+        raw_values = raw[col]
+        return (
+            raw_values.notna()
+            & ~null_token_mask(raw_values, null_tokens)
+            & clean[col].isna()
+        )
+
+    return check
+
+
+DEFAULT_RULES = [
+    Rule(
+        "missing_patient_name",
+        "Patient name is missing",
+        lambda clean, raw: clean["Patient Name"].isna(),
+    ),
+    Rule(
+        "invalid_dob",
+        "Date of birth could not be parsed",
+        coerced_to_null("Patint DOB", null_tokens=NULL_TOKENS),
+        needs_raw=True,
+    ),
+    Rule(
+        "invalid_appointment_date",
+        "Appointment date could not be parsed",
+        coerced_to_null("Appointment date time", null_tokens=NULL_TOKENS),
+        needs_raw=True,
+    ),
+    Rule(
+        "unknown_gender",
+        "Gender is not one of M/F/Male/Female or a null token",
+        coerced_to_null("Patient Gendr", null_tokens=NULL_TOKENS),
+        needs_raw=True,
+    ),
+    Rule(
+        "invalid_follow_up",
+        "Follow up is not yes/no/true/false or a null token",
+        coerced_to_null("Follow up", null_tokens=NULL_TOKENS),
+        needs_raw=True,
+    ),
+    Rule(
+        "dob_after_appointment",
+        "Date of birth is after the appointment",
+        lambda clean, raw: clean["Patint DOB"] > clean["Appointment date time"],
+    ),
+]
+
+# Source columns the raw-value rules look at
+RAW_COLUMNS = ["Patint DOB", "Appointment date time", "Patient Gendr", "Follow up"]
+
+
+def validate(clean, raw=None, rules=DEFAULT_RULES):
+    """Run rules over clean (and the matching raw rows)
+
+    Returns ``(failed, counts)``: ``failed`` holds the ``;``-separated IDs
+    of the rules each failing row broke, indexed like those rows of clean,
+    and ``counts`` the number of failing rows per rule.
+    """
+    masks = {}
+    for rule in rules:
+        if rule.needs_raw and raw is None:
+            continue
+        masks[rule.rule_id] = np.asarray(rule.check(clean, raw), dtype=bool)
+    counts = {rule_id: int(mask.sum()) for rule_id, mask in masks.items()}
+
+    failing = np.zeros(len(clean), dtype=bool)
+    for mask in masks.values():
+        failing |= mask
+    tags = np.full(int(failing.sum()), "", dtype=object)
+    for rule_id, mask in masks.items():
+        hit = mask[failing]
+        tags[hit] = np.where(tags[hit] == "", rule_id, tags[hit] + ";" + rule_id)
+    return pd.Series(tags, index=clean.index[failing], dtype=object), counts